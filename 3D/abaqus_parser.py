@@ -60,6 +60,8 @@ def parse_simulation_file(path: str) -> tuple[GlobalData, Grid]:
             bc_nodes.update(numbers)
 
     global_data_obj = GlobalData(**global_data)
-    grid = Grid(nodes, elements, bc_nodes)
+    for node_id in bc_nodes:
+        nodes[node_id - 1].convection_bc = True
+    grid = Grid.from_objects(nodes, elements)
 
     return global_data_obj, grid
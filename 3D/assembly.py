@@ -0,0 +1,347 @@
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from config import (
+    ASSEMBLY_CHUNK_SIZE,
+    DEBUG,
+    REFERENCE_ELEMENT_CACHE,
+    SHAPE_CLASS_TOLERANCE,
+)
+from jacobian import (
+    UniversalJacobian,
+    calculate_jacobians,
+    find_degenerate_elements,
+    report_degenerate_elements,
+)
+from element_matrices import calculate_element_matrices
+from boundary_matrices import (
+    FaceShapeFunctions,
+    calculate_boundary_matrices,
+    find_boundary_faces,
+)
+from fem_types import Grid, GlobalData
+
+
+class SparsityPattern:
+    """CSR sparsity pattern of the global system built from element connectivity.
+
+    Every (element, i_loc, j_loc) triplet is mapped once to its slot in the CSR
+    data array, so assembling a batch of local matrices is a single bincount.
+    """
+
+    def __init__(self, connectivity: np.ndarray, num_nodes: int):
+        connectivity = np.asarray(connectivity, dtype=np.int64)
+        nodes_per_element = connectivity.shape[1]
+
+        rows = np.repeat(connectivity, nodes_per_element, axis=1).ravel()
+        cols = np.tile(connectivity, (1, nodes_per_element)).ravel()
+
+        keys = rows * num_nodes + cols
+        unique_keys, scatter_map = np.unique(keys, return_inverse=True)
+
+        self.shape = (num_nodes, num_nodes)
+        self.nodes_per_element = nodes_per_element
+        self.indices = (unique_keys % num_nodes).astype(np.int32)
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int32)
+        np.cumsum(
+            np.bincount(unique_keys // num_nodes, minlength=num_nodes),
+            out=self.indptr[1:],
+        )
+        self.scatter_map = scatter_map.reshape(
+            connectivity.shape[0], nodes_per_element * nodes_per_element
+        )
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def assemble(self, local_matrices: np.ndarray) -> csr_matrix:
+        data = np.bincount(
+            self.scatter_map.ravel(),
+            weights=np.asarray(local_matrices).ravel(),
+            minlength=self.nnz,
+        )
+        return csr_matrix(
+            (data, self.indices.copy(), self.indptr.copy()), shape=self.shape
+        )
+
+    def zeros(self) -> csr_matrix:
+        return csr_matrix(
+            (np.zeros(self.nnz), self.indices.copy(), self.indptr.copy()),
+            shape=self.shape,
+        )
+
+    def local_slots(self, element_ids: np.ndarray, local_ids: np.ndarray) -> np.ndarray:
+        """CSR data slots of the local_ids x local_ids blocks of the given elements."""
+        k = local_ids.shape[1]
+        pairs = local_ids[:, :, None] * self.nodes_per_element + local_ids[:, None, :]
+        return np.take_along_axis(
+            self.scatter_map[element_ids],
+            pairs.reshape(len(element_ids), k * k),
+            axis=1,
+        )
+
+    def add_local(
+        self,
+        matrix: csr_matrix,
+        element_ids: np.ndarray,
+        local_ids: np.ndarray,
+        local_matrices: np.ndarray,
+    ) -> None:
+        """Adds (n, k, k) blocks in place into a matrix built by assemble()."""
+        slots = self.local_slots(element_ids, local_ids)
+        np.add.at(matrix.data, slots.ravel(), np.asarray(local_matrices).ravel())
+
+
+def assemble_vector(
+    connectivity: np.ndarray, local_vectors: np.ndarray, num_nodes: int
+) -> np.ndarray:
+    return np.bincount(
+        np.asarray(connectivity).ravel(),
+        weights=np.asarray(local_vectors).ravel(),
+        minlength=num_nodes,
+    )
+
+
+def calculate_all_element_matrices(
+    coordinates: np.ndarray,
+    k: np.ndarray,
+    rho_cp: np.ndarray,
+    Q: np.ndarray,
+    universal_jacobian: UniversalJacobian,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    H_local, C_local, P_local, degenerate = _integrate_elements(
+        coordinates, k, rho_cp, Q, universal_jacobian
+    )
+    report_degenerate_elements(degenerate)
+    return H_local, C_local, P_local
+
+
+def _integrate_elements(
+    coordinates: np.ndarray,
+    k: np.ndarray,
+    rho_cp: np.ndarray,
+    Q: np.ndarray,
+    universal_jacobian: UniversalJacobian,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Local H, C and P plus the indices of elements with detJ <= 0."""
+    num_elements = coordinates.shape[0]
+    H_local = np.empty((num_elements, 8, 8))
+    C_local = np.empty((num_elements, 8, 8))
+    P_local = np.empty((num_elements, 8))
+    degenerate = [np.empty(0, dtype=np.int64)]
+
+    # Chunks bound the (chunk, n_ip, 3, 8) derivative tensors in memory
+    for start in range(0, num_elements, ASSEMBLY_CHUNK_SIZE):
+        chunk = slice(start, start + ASSEMBLY_CHUNK_SIZE)
+        jacobians = calculate_jacobians(coordinates[chunk], universal_jacobian)
+        degenerate.append(start + find_degenerate_elements(jacobians.detJ))
+        H_local[chunk], C_local[chunk], P_local[chunk] = calculate_element_matrices(
+            universal_jacobian, jacobians, k[chunk], rho_cp[chunk], Q[chunk]
+        )
+
+    return H_local, C_local, P_local, np.concatenate(degenerate)
+
+
+def classify_element_shapes(
+    coordinates: np.ndarray, tolerance: float = SHAPE_CLASS_TOLERANCE
+) -> tuple[np.ndarray, np.ndarray]:
+    """Groups elements that are translations of each other.
+
+    Two elements fall into the same class when their node positions relative to
+    the first node agree within tolerance (relative to the largest element).
+    Returns the index of one representative element per class and the class id
+    of every element.
+    """
+    relative = coordinates - coordinates[:, :1, :]
+    scale = np.abs(relative).max() * tolerance
+    if scale == 0:  # Every element collapsed to a point: a single class
+        scale = 1.0
+    keys = np.round(relative.reshape(len(coordinates), -1) / scale).astype(np.int64)
+    _, representatives, class_ids = np.unique(
+        keys, axis=0, return_index=True, return_inverse=True
+    )
+    return representatives, class_ids.ravel()
+
+
+def calculate_element_matrices_by_shape(
+    coordinates: np.ndarray,
+    k: np.ndarray,
+    rho_cp: np.ndarray,
+    Q: np.ndarray,
+    universal_jacobian: UniversalJacobian,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Integrates one reference element per shape class and scales by material.
+
+    H, C and P are linear in k, rho*cp and Q, so congruent elements only differ
+    by those scalars. Elements with a unique shape (distorted meshes) end up in
+    their own class and are integrated in full.
+    """
+    representatives, class_ids = classify_element_shapes(coordinates)
+    if DEBUG:
+        print(f"Shape classes: {len(representatives)} for {len(coordinates)} elements")
+
+    ones = np.ones(len(representatives))
+    H_ref, C_ref, P_ref, degenerate_classes = _integrate_elements(
+        coordinates[representatives], ones, ones, ones, universal_jacobian
+    )
+    report_degenerate_elements(np.flatnonzero(np.isin(class_ids, degenerate_classes)))
+
+    H_local = H_ref[class_ids] * k[:, None, None]
+    C_local = C_ref[class_ids] * rho_cp[:, None, None]
+    P_local = P_ref[class_ids] * Q[:, None]
+    return H_local, C_local, P_local
+
+
+@dataclass
+class AssembledSystem:
+    """Global matrices of a grid with the convection terms kept separate.
+
+    H_convection and P_convection are assembled for alpha = 1 and Tenv = 1, so
+    the same assembly serves any film coefficient and ambient temperature. All
+    matrices share one sparsity pattern.
+    """
+
+    H_conduction: csr_matrix
+    H_convection: csr_matrix
+    C: csr_matrix
+    P_source: np.ndarray
+    P_convection: np.ndarray
+
+    def global_H(self, alpha: float) -> csr_matrix:
+        H = self.H_conduction
+        return csr_matrix(
+            (H.data + alpha * self.H_convection.data, H.indices, H.indptr),
+            shape=H.shape,
+        )
+
+    def global_P(self, alpha: float, t_env: float) -> np.ndarray:
+        return self.P_source + alpha * t_env * self.P_convection
+
+    def add_element_matrices(
+        self,
+        slots: np.ndarray,
+        node_ids: np.ndarray,
+        H_local: np.ndarray,
+        C_local: np.ndarray,
+        P_local: np.ndarray,
+    ) -> None:
+        """Adds element contributions in place, without touching the pattern.
+
+        slots are the (n, 64) CSR data slots of the elements (rows of
+        SparsityPattern.scatter_map) and node_ids their (n, 8) connectivity.
+        """
+        np.add.at(self.H_conduction.data, slots.ravel(), H_local.ravel())
+        np.add.at(self.C.data, slots.ravel(), C_local.ravel())
+        np.add.at(self.P_source, node_ids.ravel(), P_local.ravel())
+
+    def matrices(
+        self, global_data: GlobalData
+    ) -> tuple[csr_matrix, csr_matrix, np.ndarray]:
+        return (
+            self.global_H(global_data.Alpha),
+            self.C,
+            self.global_P(global_data.Alpha, global_data.Tenv),
+        )
+
+
+def calculate_grid_element_matrices(
+    grid: Grid, element_ids: np.ndarray = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Local H, C and P of the given elements (all elements by default)."""
+    ids = slice(None) if element_ids is None else element_ids
+    return calculate_local_matrices(
+        grid.element_coordinates(element_ids),
+        grid.k[ids],
+        grid.rho[ids] * grid.cp[ids],
+        grid.Q[ids],
+    )
+
+
+def calculate_local_matrices(
+    coordinates: np.ndarray, k: np.ndarray, rho_cp: np.ndarray, Q: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if REFERENCE_ELEMENT_CACHE:
+        return calculate_element_matrices_by_shape(
+            coordinates, k, rho_cp, Q, UniversalJacobian()
+        )
+    return calculate_all_element_matrices(
+        coordinates, k, rho_cp, Q, UniversalJacobian()
+    )
+
+
+def assemble_system(grid: Grid, pattern: SparsityPattern = None) -> AssembledSystem:
+    num_nodes = grid.num_nodes
+    H_local, C_local, P_local = calculate_grid_element_matrices(grid)
+
+    if pattern is None:
+        pattern = SparsityPattern(grid.connectivity, num_nodes)
+
+    H_conduction = pattern.assemble(H_local)
+    H_convection = pattern.zeros()
+    global_C = pattern.assemble(C_local)
+    P_source = assemble_vector(grid.connectivity, P_local, num_nodes)
+    P_convection = np.zeros(num_nodes)
+
+    faces = find_boundary_faces(grid.connectivity, grid.convection_bc)
+    if len(faces) > 0:
+        Hbc_local, P_bc_local = calculate_boundary_matrices(
+            grid.coordinates[faces.node_ids], 1.0, 1.0, FaceShapeFunctions()
+        )
+        pattern.add_local(H_convection, faces.element_ids, faces.local_ids, Hbc_local)
+        P_convection += assemble_vector(faces.node_ids, P_bc_local, num_nodes)
+
+    return AssembledSystem(H_conduction, H_convection, global_C, P_source, P_convection)
+
+
+def update_element_materials(
+    system: AssembledSystem,
+    grid: Grid,
+    pattern: SparsityPattern,
+    element_ids: np.ndarray,
+    k: np.ndarray = None,
+    rho: np.ndarray = None,
+    cp: np.ndarray = None,
+    Q: np.ndarray = None,
+) -> None:
+    """Re-assembles elements whose material changed, in place.
+
+    H, C and P are linear in k, rho*cp and Q, so the difference between the new
+    and old local matrices is integrated directly from the material change and
+    added into the existing CSR data; the sparsity pattern is untouched.
+    Omitted properties keep their current values. grid is updated as well.
+    """
+    element_ids = np.asarray(element_ids)
+    old_k, old_rho = grid.k[element_ids], grid.rho[element_ids]
+    old_cp, old_Q = grid.cp[element_ids], grid.Q[element_ids]
+    new_k = old_k if k is None else np.broadcast_to(k, old_k.shape)
+    new_rho = old_rho if rho is None else np.broadcast_to(rho, old_rho.shape)
+    new_cp = old_cp if cp is None else np.broadcast_to(cp, old_cp.shape)
+    new_Q = old_Q if Q is None else np.broadcast_to(Q, old_Q.shape)
+
+    dH, dC, dP = calculate_local_matrices(
+        grid.element_coordinates(element_ids),
+        new_k - old_k,
+        new_rho * new_cp - old_rho * old_cp,
+        new_Q - old_Q,
+    )
+
+    system.add_element_matrices(
+        pattern.scatter_map[element_ids],
+        grid.connectivity[element_ids],
+        dH,
+        dC,
+        dP,
+    )
+    grid.k[element_ids] = new_k
+    grid.rho[element_ids] = new_rho
+    grid.cp[element_ids] = new_cp
+    grid.Q[element_ids] = new_Q
+
+
+def assemble_global_matrices(
+    grid: Grid, global_data: GlobalData
+) -> tuple[csr_matrix, csr_matrix, np.ndarray]:
+    return assemble_system(grid).matrices(global_data)
@@ -0,0 +1,78 @@
+"""Global assembly benchmark: per-entry LIL scatter vs. batched COO/CSR assembly.
+
+Usage: python benchmarks/bench_assembly.py [nx ny nz]
+Defaults to the GeometryParameters grid (25x25x30).
+"""
+
+import sys
+
+import numpy as np
+from scipy.sparse import lil_matrix
+
+from common import default_generator, timed
+from assembly import (
+    SparsityPattern,
+    assemble_vector,
+    calculate_all_element_matrices,
+)
+from jacobian import UniversalJacobian
+from mesh_generator.mesh_generator import GeometryParameters
+
+
+def local_matrices(grid):
+    return calculate_all_element_matrices(
+        grid.element_coordinates(),
+        grid.k,
+        grid.rho * grid.cp,
+        grid.Q,
+        UniversalJacobian(),
+    )
+
+
+def lil_scatter(grid, H_local, C_local, P_local):
+    n = grid.num_nodes
+    global_H = lil_matrix((n, n))
+    global_C = lil_matrix((n, n))
+    global_P = np.zeros(n)
+    for e, element in enumerate(grid.elements):
+        for i_loc, node_id_i in enumerate(element.node_ids):
+            idx_i = node_id_i - 1
+            global_P[idx_i] += P_local[e, i_loc]
+            for j_loc, node_id_j in enumerate(element.node_ids):
+                idx_j = node_id_j - 1
+                global_H[idx_i, idx_j] += H_local[e, i_loc, j_loc]
+                global_C[idx_i, idx_j] += C_local[e, i_loc, j_loc]
+    return global_H.tocsr(), global_C.tocsr(), global_P
+
+
+def csr_scatter(grid, H_local, C_local, P_local):
+    connectivity = grid.connectivity
+    pattern = SparsityPattern(connectivity, grid.num_nodes)
+    return (
+        pattern.assemble(H_local),
+        pattern.assemble(C_local),
+        assemble_vector(connectivity, P_local, grid.num_nodes),
+    )
+
+
+if __name__ == "__main__":
+    geometry = GeometryParameters()
+    if len(sys.argv) == 4:
+        geometry.nx, geometry.ny, geometry.nz = map(int, sys.argv[1:])
+
+    grid = default_generator(geometry).generate_grid()
+
+    results = {}
+    with timed("element matrices", results):
+        H_local, C_local, P_local = local_matrices(grid)
+    with timed("LIL scatter (baseline)", results):
+        H_lil, C_lil, P_lil = lil_scatter(grid, H_local, C_local, P_local)
+    with timed("COO/CSR scatter", results):
+        H_csr, C_csr, P_csr = csr_scatter(grid, H_local, C_local, P_local)
+
+    print(
+        f"Speedup: {results['LIL scatter (baseline)'] / results['COO/CSR scatter']:.1f}x"
+    )
+    print(f"max |dH| = {abs(H_lil - H_csr).max():.3e}")
+    print(f"max |dC| = {abs(C_lil - C_csr).max():.3e}")
+    print(f"max |dP| = {np.abs(P_lil - P_csr).max():.3e}")
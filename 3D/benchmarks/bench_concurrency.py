@@ -0,0 +1,72 @@
+"""Processes vs. BLAS/OpenMP threads for many-small and few-large batches.
+
+Runs each batch under every processes x threads split of the CPU budget and
+marks the split plan_concurrency() would pick. Many small jobs favour more
+processes; a few large jobs leave CPUs that only threads can use.
+
+Usage: python benchmarks/bench_concurrency.py [--cpus N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import tempfile
+
+from common import ROOT_DIR, timed, write_config
+import main
+import system_cache
+from concurrency import plan_concurrency
+from scheduler import build_tasks, run_tasks
+
+PREFIX = "bench_concurrency_"
+
+# name -> (number of jobs, nx, ny, nz, simulated seconds)
+BATCHES = {
+    "many small": (16, 8, 8, 10, 20.0),
+    "few large": (2, 24, 24, 28, 5.0),
+}
+
+
+def quiet_run_task(task) -> str:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.run_task(task)
+
+
+def splits(cpus: int) -> list[tuple[int, int]]:
+    return [(p, cpus // p) for p in range(1, cpus + 1) if cpus % p == 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cpus", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    main.PLOT_GRID = main.PLOT_MAX = main.SAVE_TO_NPY = False
+    system_cache.SYSTEM_CACHE_ENABLED = False
+
+    print(f"CPU budget: {args.cpus} (available: {os.cpu_count()})")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for batch, (count, nx, ny, nz, sim_time) in BATCHES.items():
+            files = [
+                write_config(directory, f"{PREFIX}{i}", nx, ny, nz, sim_time)
+                for i in range(count)
+            ]
+            tasks = build_tasks(files, run_all_patterns=False)
+            plan = plan_concurrency(len(tasks), args.cpus, 0, args.cpus)
+            for processes, threads in splits(args.cpus):
+                chosen = " (planned)" if processes == plan.processes else ""
+                label = f"{batch}: {processes}p x {threads}t{chosen}"
+                with timed(label, results):
+                    for _ in run_tasks(
+                        quiet_run_task,
+                        tasks,
+                        min(processes, len(tasks)),
+                        threads_per_process=threads,
+                    ):
+                        pass
+
+    for path in glob.glob(os.path.join(ROOT_DIR, "output", PREFIX + "*")):
+        os.remove(path)
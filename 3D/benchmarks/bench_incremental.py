@@ -0,0 +1,46 @@
+"""Paste pattern switch: full reassembly vs. in-place update of the paste layer.
+
+Usage: python benchmarks/bench_incremental.py [nx ny nz]
+Defaults to the GeometryParameters grid (25x25x30).
+"""
+
+import sys
+
+import numpy as np
+
+from common import default_generator, timed
+from assembly import SparsityPattern, assemble_system, update_element_materials
+from mesh_generator.mesh_generator import GeometryParameters, PastePattern
+
+if __name__ == "__main__":
+    geometry = GeometryParameters()
+    if len(sys.argv) == 4:
+        geometry.nx, geometry.ny, geometry.nz = map(int, sys.argv[1:])
+
+    generator = default_generator(geometry)
+    generator.pattern = PastePattern.FULL
+    grid = generator.generate_grid()
+    pattern = SparsityPattern(grid.connectivity, grid.num_nodes)
+    system = assemble_system(grid, pattern)
+    paste_elements = generator.paste_layer_elements()
+    print(f"{len(paste_elements)} of {grid.num_elements} elements in the paste layer")
+
+    results = {}
+    for paste_pattern in (PastePattern.DOT, PastePattern.X_SHAPE):
+        generator.pattern = paste_pattern
+        with timed(f"{paste_pattern.name}: full reassembly", results):
+            reference = assemble_system(generator.generate_grid())
+        with timed(f"{paste_pattern.name}: incremental update", results):
+            k, rho, cp = generator.paste_layer_materials()
+            update_element_materials(
+                system, grid, pattern, paste_elements, k=k, rho=rho, cp=cp
+            )
+
+        full = results[f"{paste_pattern.name}: full reassembly"]
+        incremental = results[f"{paste_pattern.name}: incremental update"]
+        print(f"Speedup: {full / incremental:.1f}x")
+        print(
+            f"max |dH| = {abs(system.H_conduction - reference.H_conduction).max():.3e}"
+        )
+        print(f"max |dC| = {abs(system.C - reference.C).max():.3e}")
+        print(f"max |dP| = {np.abs(system.P_source - reference.P_source).max():.3e}")
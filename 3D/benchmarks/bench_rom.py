@@ -0,0 +1,53 @@
+"""Power trace reruns: the full transient vs. the Krylov reduced-order model.
+
+Builds the reduced model of the default config once, then runs random
+piecewise-constant power traces through both models.
+
+Usage: python benchmarks/bench_rom.py [num_traces]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from common import DEFAULT_CONFIG, timed
+from config_loader import ConfigLoader
+from rom import compare_with_full, load_or_build_reduced_model
+
+
+def random_trace(rng: np.random.Generator, sim_time: float):
+    switch_times = np.sort(rng.uniform(0.0, sim_time, 4))
+    powers = rng.uniform(30.0, 150.0, 5)
+    return lambda time: float(powers[np.searchsorted(switch_times, time)])
+
+
+if __name__ == "__main__":
+    num_traces = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    cfg = ConfigLoader.load_from_file(DEFAULT_CONFIG)
+    global_data = cfg.global_data()
+    rng = np.random.default_rng(0)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with timed("build Krylov reduced model", results):
+            with contextlib.redirect_stdout(io.StringIO()):
+                model = load_or_build_reduced_model(
+                    cfg, os.path.join(directory, "rom.npz")
+                )
+    print(f"{model.size} reduced DOFs for {model.basis.shape[0]} free nodes")
+
+    for i in range(num_traces):
+        comparison = compare_with_full(
+            model, global_data, random_trace(rng, global_data.SimulationTime)
+        )
+        print(
+            f"trace #{i}: full {comparison.full_time:.3f} s, "
+            f"reduced {comparison.reduced_time:.4f} s ({comparison.speedup:.0f}x), "
+            f"max |dT| {comparison.max_error:.3e} C "
+            f"(bound {comparison.error_bound:.3e} C)"
+        )
@@ -0,0 +1,113 @@
+"""Power/ambient/water scenarios: one run_simulation_task() each vs. one batch.
+
+Each task meshes, assembles (no system cache), factorizes and steps its own
+scenario. The batch assembles and factorizes once and advances all scenarios
+as columns of one right-hand side block.
+
+Usage: python benchmarks/bench_scenarios.py [num_scenarios] [sim_time]
+"""
+
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import tempfile
+
+import numpy as np
+
+from common import DEFAULT_CONFIG, ROOT_DIR, timed
+import main
+import system_cache
+from config_loader import ConfigLoader
+from history import MaxTemperatureTracker
+from scenarios import Scenario, simulate_scenarios
+
+PREFIX = "bench_scenarios_"
+
+
+def scenario_config(directory: str, index: int, scenario: Scenario, sim_time: float):
+    with open(DEFAULT_CONFIG) as f:
+        text = f.read()
+    for key, value in (
+        ("power", scenario.power_scale),
+        ("ambient_temp", scenario.ambient_temp),
+        ("water_temp", scenario.water_temp),
+        ("time", sim_time),
+    ):
+        text = re.sub(rf"^{key} = \S+", f"{key} = {value}", text, flags=re.M)
+    path = os.path.join(directory, f"{PREFIX}{index}.toml")
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+if __name__ == "__main__":
+    num_scenarios = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    sim_time = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+
+    main.PLOT_GRID = main.PLOT_MAX = main.SAVE_TO_NPY = False
+    system_cache.SYSTEM_CACHE_ENABLED = False
+
+    rng = np.random.default_rng(0)
+    scenarios = [
+        Scenario(
+            f"scenario_{i}",
+            power_scale=float(rng.uniform(60.0, 140.0)),
+            ambient_temp=float(rng.uniform(20.0, 35.0)),
+            water_temp=float(rng.uniform(25.0, 40.0)),
+        )
+        for i in range(num_scenarios)
+    ]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        files = [
+            scenario_config(directory, i, scenario, sim_time)
+            for i, scenario in enumerate(scenarios)
+        ]
+        with timed(f"{num_scenarios} x run_simulation_task()", results):
+            with contextlib.redirect_stdout(io.StringIO()):
+                for file in files:
+                    main.run_simulation_task(file)
+
+        cfg = ConfigLoader.load_from_file(files[0])
+        trackers = [MaxTemperatureTracker() for _ in scenarios]
+        with timed(f"simulate_scenarios() of {num_scenarios}", results):
+            with contextlib.redirect_stdout(io.StringIO()):
+                grid, assembled = system_cache.load_or_assemble(
+                    cfg.mesh_generator(power=1.0), None
+                )
+                simulate_scenarios(
+                    grid,
+                    cfg.global_data(),
+                    scenarios,
+                    cfg.simulation.solver,
+                    sinks=trackers,
+                    assembled=assembled,
+                    time_stepping=cfg.simulation.time_stepping,
+                )
+
+        per_task = []
+        for i in range(num_scenarios):
+            with open(os.path.join(ROOT_DIR, "output", f"{PREFIX}{i}_result.txt")) as f:
+                per_task.append(
+                    float(re.search(r"Max Temp Reached: (\S+)", f.read())[1])
+                )
+        deviation = max(
+            abs(expected - tracker.max_temps[-1])
+            for expected, tracker in zip(per_task, trackers)
+        )
+        print(
+            f"max |dT| of final max temperatures: {deviation:.3e} C (results: 0.01 C)"
+        )
+
+    speedup = (
+        results[f"{num_scenarios} x run_simulation_task()"]
+        / results[f"simulate_scenarios() of {num_scenarios}"]
+    )
+    print(f"Speedup: {speedup:.2f}x")
+
+    for path in glob.glob(os.path.join(ROOT_DIR, "output", PREFIX + "*")):
+        os.remove(path)
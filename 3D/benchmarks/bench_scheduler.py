@@ -0,0 +1,95 @@
+"""Batch throughput: the old main.py pool sizing vs. the task scheduler.
+
+The old code sized the pool by the number of config files and used starmap,
+so one config with RUN_ALL_PATTERNS ran its four patterns on one worker.
+
+Usage: python benchmarks/bench_scheduler.py [--workers N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import tempfile
+
+from common import ROOT_DIR, timed, write_config
+import main
+import system_cache
+from mesh_generator.mesh_generator import PastePattern
+from scheduler import build_tasks, run_tasks
+
+PREFIX = "bench_scheduler_"
+
+# (nx, ny, nz, simulated seconds) of the mixed-size batch
+MIXED_BATCH = [
+    (20, 20, 24, 10.0),
+    (10, 10, 12, 10.0),
+    (16, 16, 20, 10.0),
+    (8, 8, 10, 10.0),
+    (12, 12, 16, 10.0),
+    (10, 10, 12, 10.0),
+    (14, 14, 18, 10.0),
+    (8, 8, 10, 10.0),
+]
+
+
+def quiet_task(*args) -> str:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.run_simulation_task(*args)
+
+
+def quiet_run_task(task) -> str:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.run_task(task)
+
+
+def legacy_schedule(files, run_all_patterns, num_cores):
+    """The pool logic main.py used before the scheduler."""
+    with multiprocessing.Pool(processes=min(num_cores, len(files))) as pool:
+        if run_all_patterns:
+            tasks = [(file, pattern) for file in files for pattern in PastePattern]
+            return pool.starmap(quiet_task, tasks)
+        return list(pool.imap_unordered(quiet_task, files))
+
+
+def scheduled(files, run_all_patterns, num_workers):
+    tasks = build_tasks(files, run_all_patterns)
+    workers = min(num_workers, len(tasks))
+    return [result for _, result in run_tasks(quiet_run_task, tasks, workers)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers", type=int, default=min(4, multiprocessing.cpu_count())
+    )
+    args = parser.parse_args()
+
+    # Measure scheduling only: no plots, no history files, no system cache
+    main.PLOT_GRID = main.PLOT_MAX = main.SAVE_TO_NPY = False
+    system_cache.SYSTEM_CACHE_ENABLED = False
+
+    print(f"Workers: {args.workers} (CPUs: {multiprocessing.cpu_count()})")
+    with tempfile.TemporaryDirectory() as directory:
+        single = [write_config(directory, PREFIX + "single", 16, 16, 20, 10.0)]
+        mixed = [
+            write_config(directory, f"{PREFIX}mixed_{i}", *params)
+            for i, params in enumerate(MIXED_BATCH)
+        ]
+
+        results = {}
+        for label, files, run_all_patterns in (
+            ("1 config x 4 patterns", single, True),
+            (f"{len(mixed)} mixed-size configs", mixed, False),
+        ):
+            with timed(f"{label}: legacy pool", results):
+                legacy_schedule(files, run_all_patterns, args.workers)
+            with timed(f"{label}: scheduler", results):
+                scheduled(files, run_all_patterns, args.workers)
+            speedup = results[f"{label}: legacy pool"] / results[f"{label}: scheduler"]
+            print(f"Speedup: {speedup:.2f}x")
+
+    for path in glob.glob(os.path.join(ROOT_DIR, "output", PREFIX + "*")):
+        os.remove(path)
@@ -0,0 +1,67 @@
+"""What-if evaluation: a full simulation vs. a weighted sum of unit responses.
+
+Builds the response basis of the default config once, then compares random
+power/temperature combinations against full simulations.
+
+Usage: python benchmarks/bench_superposition.py [num_combinations]
+"""
+
+import contextlib
+import dataclasses
+import io
+import sys
+import tempfile
+
+import numpy as np
+
+from common import DEFAULT_CONFIG, timed
+from config_loader import ConfigLoader
+from simulate import simulate
+from superposition import build_response_basis
+from system_cache import load_or_assemble
+
+if __name__ == "__main__":
+    num_combinations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    cfg = ConfigLoader.load_from_file(DEFAULT_CONFIG)
+    grid, assembled = load_or_assemble(cfg.mesh_generator(power=1.0), None)
+    rng = np.random.default_rng(0)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with timed("build response basis", results):
+            with contextlib.redirect_stdout(io.StringIO()):
+                basis = build_response_basis(cfg, f"{directory}/basis")
+
+        for i in range(num_combinations):
+            inputs = (
+                rng.uniform(60.0, 140.0),
+                rng.uniform(20.0, 35.0),
+                rng.uniform(25.0, 40.0),
+                rng.uniform(25.0, 40.0),
+            )
+            global_data = dataclasses.replace(
+                cfg.global_data(),
+                Tenv=inputs[1],
+                WaterTemp=inputs[2],
+                InitialTemp=inputs[3],
+            )
+            power_assembled = dataclasses.replace(
+                assembled, P_source=inputs[0] * assembled.P_source
+            )
+            with timed(f"#{i}: full simulation", results):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    reference = simulate(
+                        grid,
+                        global_data,
+                        cfg.simulation.solver,
+                        assembled=power_assembled,
+                    )
+            with timed(f"#{i}: superposition", results):
+                temperatures = basis.evaluate(*inputs)
+
+            error = np.abs(temperatures - np.array(reference)).max()
+            speedup = (
+                results[f"#{i}: full simulation"] / results[f"#{i}: superposition"]
+            )
+            print(f"max |dT| = {error:.3e} C, speedup: {speedup:.0f}x")
@@ -0,0 +1,57 @@
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from config_loader import ConfigLoader
+from mesh_generator.mesh_generator import (
+    GeometryParameters,
+    MeshGenerator,
+    MeshGeneratorBuilder,
+)
+
+DEFAULT_CONFIG = os.path.join(ROOT_DIR, "simulations", "ryzen_7.toml")
+
+
+def default_generator(geometry: GeometryParameters = None) -> MeshGenerator:
+    """Mesh generator on the default GeometryParameters grid with ryzen_7 materials."""
+    cfg = ConfigLoader.load_from_file(DEFAULT_CONFIG)
+    geo = geometry if geometry is not None else GeometryParameters()
+    return (
+        MeshGeneratorBuilder()
+        .set_parameters(geo.width, geo.depth, geo.height)
+        .set_resolution(geo.nx, geo.ny, geo.nz)
+        .set_die_size(geo.die_width, geo.die_depth)
+        .set_materials(cfg.materials)
+        .set_layers(cfg.layers)
+        .set_power(cfg.power)
+        .set_paste_pattern(cfg.paste_pattern)
+        .build()
+    )
+
+
+@contextmanager
+def timed(label: str, results: dict):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+    print(f"{label:<40} {results[label]:10.3f} s")
+
+
+def write_config(
+    directory: str, name: str, nx: int, ny: int, nz: int, sim_time: float
+) -> str:
+    """Copy of the default config with another resolution and duration."""
+    with open(DEFAULT_CONFIG) as f:
+        text = f.read()
+    for key, value in (("nx", nx), ("ny", ny), ("nz", nz), ("time", sim_time)):
+        text = re.sub(rf"^{key} = \S+", f"{key} = {value}", text, flags=re.M)
+    path = os.path.join(directory, name + ".toml")
+    with open(path, "w") as f:
+        f.write(text)
+    return path
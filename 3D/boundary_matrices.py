@@ -1,93 +1,92 @@
 import numpy as np
-from fem_types import Element, GlobalData, Grid
+from dataclasses import dataclass
 from config import NUMBER_OF_INTEGRATION_POINTS
 from gauss_integration import GAUSS_QUADRATURE
 
-HEX_FACES = [
-    [0, 3, 2, 1],  # -Z
-    [4, 5, 6, 7],  # +Z
-    [0, 1, 5, 4],  # -Y
-    [1, 2, 6, 5],  # +X
-    [2, 3, 7, 6],  # +Y
-    [3, 0, 4, 7],  # -X
-]
-
-
-def get_face_shape_fns_and_derivs(
-    u: float, v: float
-) -> tuple[np.array, np.array, np.array]:
-    N = np.array(
-        [
-            0.25 * (1 - u) * (1 - v),
-            0.25 * (1 + u) * (1 - v),
-            0.25 * (1 + u) * (1 + v),
-            0.25 * (1 - u) * (1 + v),
-        ]
-    )
-    dN_du = np.array([-0.25 * (1 - v), 0.25 * (1 - v), 0.25 * (1 + v), -0.25 * (1 + v)])
-    dN_dv = np.array([-0.25 * (1 - u), -0.25 * (1 + u), 0.25 * (1 + u), 0.25 * (1 - u)])
-    return N, dN_du, dN_dv
-
-
-def generate_Hbc_matrix_and_P_vector(
-    element: Element, globalData: GlobalData, grid: Grid
-) -> tuple[np.matrix, np.matrix]:
-
-    Hbc_matrix = np.zeros((8, 8))
-    P_vector = np.zeros(8)
-
-    gauss_points = GAUSS_QUADRATURE[NUMBER_OF_INTEGRATION_POINTS]["nodes"]
-    weights = GAUSS_QUADRATURE[NUMBER_OF_INTEGRATION_POINTS]["weights"]
-
+HEX_FACES = np.array(
+    [
+        [0, 3, 2, 1],  # -Z
+        [4, 5, 6, 7],  # +Z
+        [0, 1, 5, 4],  # -Y
+        [1, 2, 6, 5],  # +X
+        [2, 3, 7, 6],  # +Y
+        [3, 0, 4, 7],  # -X
+    ]
+)
+
+
+@dataclass
+class BoundaryFaces:
+    element_ids: np.ndarray  # (n_faces,) owning element
+    local_ids: np.ndarray  # (n_faces, 4) face nodes as element-local indices
+    node_ids: np.ndarray  # (n_faces, 4) face nodes as 0-based global indices
+
+    def __len__(self) -> int:
+        return len(self.element_ids)
+
+
+@dataclass
+class FaceShapeFunctions:
+    N: np.ndarray  # (n_gp, 4)
+    dN_du: np.ndarray  # (n_gp, 4)
+    dN_dv: np.ndarray  # (n_gp, 4)
+    weights: np.ndarray  # (n_gp,)
+
+    def __init__(self):
+        gauss_points = GAUSS_QUADRATURE[NUMBER_OF_INTEGRATION_POINTS]["nodes"]
+        gauss_weights = GAUSS_QUADRATURE[NUMBER_OF_INTEGRATION_POINTS]["weights"]
+
+        u, v = np.meshgrid(gauss_points, gauss_points, indexing="ij")
+        u, v = u.ravel(), v.ravel()
+        self.weights = np.outer(gauss_weights, gauss_weights).ravel()
+
+        self.N = 0.25 * np.stack(
+            [
+                (1 - u) * (1 - v),
+                (1 + u) * (1 - v),
+                (1 + u) * (1 + v),
+                (1 - u) * (1 + v),
+            ],
+            axis=1,
+        )
+        self.dN_du = 0.25 * np.stack([-(1 - v), 1 - v, 1 + v, -(1 + v)], axis=1)
+        self.dN_dv = 0.25 * np.stack([-(1 - u), -(1 + u), 1 + u, 1 - u], axis=1)
+
+
+def find_boundary_faces(
+    connectivity: np.ndarray, convection_mask: np.ndarray
+) -> BoundaryFaces:
+    """Element faces whose four nodes all carry the convection BC."""
+    element_ids = []
+    local_ids = []
     for face_local_ids in HEX_FACES:
-        is_boundary_face = True
-        for local_id in face_local_ids:
-            global_id = element.node_ids[local_id]
-            if not grid.nodes[global_id - 1].convection_bc:
-                is_boundary_face = False
-                break
-
-        if not is_boundary_face:
-            continue
-
-        face_nodes = [grid.nodes[element.node_ids[lid] - 1] for lid in face_local_ids]
-        xs = np.array([n.x for n in face_nodes])
-        ys = np.array([n.y for n in face_nodes])
-        zs = np.array([n.z for n in face_nodes])
-
-        for i, u in enumerate(gauss_points):
-            for j, v in enumerate(gauss_points):
-                weight = weights[i] * weights[j]
-                N_2d, dN_du, dN_dv = get_face_shape_fns_and_derivs(u, v)
-
-                dx_du = np.sum(dN_du * xs)
-                dy_du = np.sum(dN_du * ys)
-                dz_du = np.sum(dN_du * zs)
-                t_u = np.array([dx_du, dy_du, dz_du])
-
-                dx_dv = np.sum(dN_dv * xs)
-                dy_dv = np.sum(dN_dv * ys)
-                dz_dv = np.sum(dN_dv * zs)
-                t_v = np.array([dx_dv, dy_dv, dz_dv])
-
-                normal_vector = np.cross(t_u, t_v)
-                detJ_surf = np.linalg.norm(normal_vector)
-
-                N_3d_on_face = np.zeros(8)
-                for k, local_node_idx in enumerate(face_local_ids):
-                    N_3d_on_face[local_node_idx] = N_2d[k]
-                Hbc_matrix += (
-                    np.outer(N_3d_on_face, N_3d_on_face)
-                    * globalData.Alpha
-                    * detJ_surf
-                    * weight
-                )
-                P_vector += (
-                    N_3d_on_face
-                    * globalData.Alpha
-                    * globalData.Tenv
-                    * detJ_surf
-                    * weight
-                )
-
-    return Hbc_matrix, P_vector
+        on_boundary = np.all(convection_mask[connectivity[:, face_local_ids]], axis=1)
+        face_elements = np.flatnonzero(on_boundary)
+        element_ids.append(face_elements)
+        local_ids.append(np.broadcast_to(face_local_ids, (len(face_elements), 4)))
+
+    element_ids = np.concatenate(element_ids)
+    local_ids = np.concatenate(local_ids)
+    node_ids = np.take_along_axis(connectivity[element_ids], local_ids, axis=1)
+    return BoundaryFaces(element_ids, local_ids, node_ids)
+
+
+def calculate_boundary_matrices(
+    face_coordinates: np.ndarray,
+    alpha: float,
+    t_env: float,
+    face_shape_functions: FaceShapeFunctions,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Convection Hbc (n_faces, 4, 4) and P (n_faces, 4) for all boundary faces.
+
+    face_coordinates has shape (n_faces, 4, 3).
+    """
+    fsf = face_shape_functions
+    t_u = np.einsum("gn,fnc->fgc", fsf.dN_du, face_coordinates)
+    t_v = np.einsum("gn,fnc->fgc", fsf.dN_dv, face_coordinates)
+    detJ_surf = np.linalg.norm(np.cross(t_u, t_v), axis=2)
+    weighted_detJ = detJ_surf * fsf.weights
+
+    Hbc_matrices = alpha * np.einsum("fg,gn,gm->fnm", weighted_detJ, fsf.N, fsf.N)
+    P_vectors = alpha * t_env * (weighted_detJ @ fsf.N)
+    return Hbc_matrices, P_vectors
@@ -0,0 +1,66 @@
+import os
+from dataclasses import dataclass
+
+from threadpoolctl import threadpool_limits
+
+from config import MAX_PROCESSES, THREADS_PER_PROCESS
+
+# Read by OpenBLAS, MKL, BLIS, Apple Accelerate and OpenMP when they load
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+_thread_limits = None
+
+
+@dataclass
+class ConcurrencyPlan:
+    processes: int
+    threads_per_process: int
+
+    def __str__(self) -> str:
+        return f"{self.processes} process(es) x {self.threads_per_process} thread(s)"
+
+
+def plan_concurrency(
+    num_tasks: int,
+    max_processes: int = MAX_PROCESSES,
+    threads_per_process: int = THREADS_PER_PROCESS,
+    num_cpus: int = None,
+) -> ConcurrencyPlan:
+    """Splits the CPUs between worker processes and BLAS/OpenMP threads.
+
+    Processes come first, one per task up to max_processes, since independent
+    simulations scale better than threaded kernels. The remaining CPUs go to
+    threads, so a few large tasks each get several threads while many small
+    tasks run one thread per process. threads_per_process > 0 overrides the
+    thread count.
+    """
+    num_cpus = num_cpus if num_cpus is not None else os.cpu_count() or 1
+    processes = max(1, min(max_processes, num_tasks, num_cpus))
+    if threads_per_process > 0:
+        threads = threads_per_process
+    else:
+        threads = max(1, num_cpus // processes)
+    return ConcurrencyPlan(processes, threads)
+
+
+def limit_threads(threads: int) -> None:
+    """Caps BLAS/OpenMP thread pools in the current process.
+
+    Forked pool workers inherit numpy/scipy with their thread pools already
+    loaded, where the environment variables have no effect any more, so the
+    running pools are limited through threadpoolctl. The variables are still
+    set for libraries loaded later and for spawned child processes.
+    """
+    global _thread_limits
+
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    # Keep a reference; the limits stay in place until it is restored
+    _thread_limits = threadpool_limits(limits=threads)
@@ -1,6 +1,7 @@
 NUMBER_OF_INTEGRATION_POINTS = 4
 DEBUG = False
-SAVE_TO_CSV = True
+SAVE_TO_NPY = True  # Memory-mappable binary temperature history
+SAVE_TO_CSV = False  # CSV export of the temperature history
 PLOT_MAX = True
 PLOT_GRID = True
 ENTIRE_RADIATOR_HAS_DERICHLET_BC = False  # If False, only the top face has Dirichlet BC
@@ -8,3 +9,9 @@ MULTIPROCESSING_ENABLED = True
 MAX_PROCESSES = 4
 PLOT_SAVE_INTERVAL = 1.0
 RUN_ALL_PATTERNS = False  # If True, runs all mesh patterns
+ASSEMBLY_CHUNK_SIZE = 2048  # Elements integrated per batch during assembly
+REFERENCE_ELEMENT_CACHE = True  # Integrate once per congruent element shape
+SHAPE_CLASS_TOLERANCE = 1e-9  # Relative tolerance for matching element shapes
+SYSTEM_CACHE_ENABLED = True  # Reuse assembled matrices across runs with the same mesh
+SYSTEM_CACHE_MAX_MB = 2048  # Least recently used entries are evicted beyond this
+THREADS_PER_PROCESS = 0  # BLAS/OpenMP threads per worker, 0 = CPUs / processes
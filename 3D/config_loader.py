@@ -3,13 +3,20 @@ import os
 from dataclasses import dataclass
 from typing import Any
 
+from fem_types import GlobalData
 from mesh_generator.mesh_generator import (
+    MeshGenerator,
+    MeshGeneratorBuilder,
     PastePattern,
     MaterialConfig,
     MaterialProperties,
     LayerConfig,
     GeometryParameters,
 )
+from solver import SolverSettings, SOLVERS, PRECONDITIONERS
+from time_stepping import TimeSteppingSettings, TIME_STEPPING_MODES
+
+SIMULATION_MODES = ("transient", "steady")
 
 
 @dataclass
@@ -20,6 +27,9 @@ class SimulationSettings:
     ambient_temp: float
     water_temp: float
     alpha: float
+    solver: SolverSettings
+    time_stepping: TimeSteppingSettings
+    mode: str = "transient"
 
 
 @dataclass
@@ -31,6 +41,45 @@ class FullConfiguration:
     power: float
     paste_pattern: PastePattern
 
+    def mesh_generator(
+        self, paste_pattern: PastePattern = None, power: float = None
+    ) -> MeshGenerator:
+        return (
+            MeshGeneratorBuilder()
+            .set_parameters(
+                self.geometry.width, self.geometry.depth, self.geometry.height
+            )
+            .set_resolution(self.geometry.nx, self.geometry.ny, self.geometry.nz)
+            .set_die_size(self.geometry.die_width, self.geometry.die_depth)
+            .set_materials(self.materials)
+            .set_layers(self.layers)
+            .set_power(self.power if power is None else power)
+            .set_paste_pattern(paste_pattern if paste_pattern else self.paste_pattern)
+            .set_grading(
+                self.geometry.grading,
+                self.geometry.growth_ratio,
+                self.geometry.max_ratio,
+            )
+            .build()
+        )
+
+    def global_data(self) -> GlobalData:
+        return GlobalData(
+            SimulationTime=self.simulation.sim_time,
+            SimulationStepTime=self.simulation.step_time,
+            InitialTemp=self.simulation.initial_temp,
+            Alpha=self.simulation.alpha,
+            Tenv=self.simulation.ambient_temp,
+            WaterTemp=self.simulation.water_temp,
+            Conductivity=0,
+            Density=0,
+            SpecificHeat=0,
+        )
+
+
+def optional_float(value: Any) -> float | None:
+    return None if value is None else float(value)
+
 
 class ConfigLoader:
     @staticmethod
@@ -41,9 +90,52 @@ class ConfigLoader:
         with open(filepath, "rb") as f:
             data = tomllib.load(f)
 
+        return ConfigLoader.load_from_dict(data)
+
+    @staticmethod
+    def load_from_dict(data: dict[str, Any]) -> FullConfiguration:
+        """Builds the configuration from parsed TOML tables."""
         sim_data = data.get("simulation", {})
         env_data = data.get("environment", {})
 
+        solver_name = str(sim_data.get("solver", "direct")).lower()
+        if solver_name not in SOLVERS:
+            print(f"Warning: Unknown solver '{solver_name}'. Defaulting to direct.")
+            solver_name = "direct"
+        preconditioner = str(sim_data.get("preconditioner", "jacobi")).lower()
+        if preconditioner not in PRECONDITIONERS:
+            print(
+                f"Warning: Unknown preconditioner '{preconditioner}'. Defaulting to jacobi."
+            )
+            preconditioner = "jacobi"
+
+        solver_settings = SolverSettings(
+            solver=solver_name,
+            preconditioner=preconditioner,
+            tolerance=float(sim_data.get("solver_tolerance", 1e-8)),
+            max_iterations=int(sim_data.get("max_iterations", 1000)),
+        )
+
+        time_stepping_mode = str(sim_data.get("time_stepping", "fixed")).lower()
+        if time_stepping_mode not in TIME_STEPPING_MODES:
+            print(
+                f"Warning: Unknown time stepping '{time_stepping_mode}'. Defaulting to fixed."
+            )
+            time_stepping_mode = "fixed"
+
+        time_stepping = TimeSteppingSettings(
+            mode=time_stepping_mode,
+            tolerance=float(sim_data.get("step_tolerance", 0.05)),
+            min_step_time=optional_float(sim_data.get("min_step_time")),
+            max_step_time=optional_float(sim_data.get("max_step_time")),
+            steady_tolerance=float(sim_data.get("steady_tolerance", 0.0)),
+        )
+
+        mode = str(sim_data.get("mode", "transient")).lower()
+        if mode not in SIMULATION_MODES:
+            print(f"Warning: Unknown mode '{mode}'. Defaulting to transient.")
+            mode = "transient"
+
         simulation_settings = SimulationSettings(
             sim_time=float(sim_data.get("time", 50.0)),
             step_time=float(sim_data.get("step_time", 1.0)),
@@ -51,6 +143,9 @@ class ConfigLoader:
             ambient_temp=float(env_data.get("ambient_temp", 25.0)),
             water_temp=float(env_data.get("water_temp", 30.0)),
             alpha=float(env_data.get("alpha", 50000.0)),
+            solver=solver_settings,
+            time_stepping=time_stepping,
+            mode=mode,
         )
 
         geo_data = data.get("geometry", {})
@@ -68,6 +163,9 @@ class ConfigLoader:
             nz=int(mesh_data.get("nz", 30)),
             die_width=float(die_width),
             die_depth=float(die_depth),
+            grading=bool(mesh_data.get("grading", False)),
+            growth_ratio=float(mesh_data.get("growth_ratio", 1.2)),
+            max_ratio=float(mesh_data.get("max_ratio", 8.0)),
         )
 
         power = float(die_data.get("power", 95.0))
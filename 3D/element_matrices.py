@@ -1,95 +1,53 @@
 import numpy as np
-from typing import List
 
-from jacobian import Jacobian, UniversalJacobian
-from config import NUMBER_OF_INTEGRATION_POINTS
-from gauss_integration import GAUSS_QUADRATURE
-from fem_types import Element, GlobalData
+from jacobian import UniversalJacobian
+from fem_types import ElementJacobians
 
 
 def transform_local_derivatives_to_global(
-    dN_d_xi: np.matrix,
-    dN_d_eta: np.matrix,
-    dN_d_zeta: np.matrix,
-    jacobians: List[Jacobian],
-) -> tuple[np.matrix, np.matrix, np.matrix]:
-    dN_d_x = np.zeros(dN_d_xi.shape)
-    dN_d_y = np.zeros(dN_d_eta.shape)
-    dN_d_z = np.zeros(dN_d_zeta.shape)
+    dN_d_local: np.ndarray,
+    invJ: np.ndarray,
+) -> np.ndarray:
+    """dN/d(x, y, z) for every element and integration point.
 
-    num_points = dN_d_xi.shape[0]
-    for i in range(num_points):
-        invJ = jacobians[i].invJ
-        for n in range(8):
-            dN_d_x[i, n] = (
-                invJ[0, 0] * dN_d_xi[i, n]
-                + invJ[0, 1] * dN_d_eta[i, n]
-                + invJ[0, 2] * dN_d_zeta[i, n]
-            )
-            dN_d_y[i, n] = (
-                invJ[1, 0] * dN_d_xi[i, n]
-                + invJ[1, 1] * dN_d_eta[i, n]
-                + invJ[1, 2] * dN_d_zeta[i, n]
-            )
-            dN_d_z[i, n] = (
-                invJ[2, 0] * dN_d_xi[i, n]
-                + invJ[2, 1] * dN_d_eta[i, n]
-                + invJ[2, 2] * dN_d_zeta[i, n]
-            )
-
-    return dN_d_x, dN_d_y, dN_d_z
+    dN_d_local has shape (n_ip, 3, 8) and invJ (n_elem, n_ip, 3, 3); the result
+    has shape (n_elem, n_ip, 3, 8) with axis 2 ordered x, y, z.
+    """
+    return np.einsum("epab,pbn->epan", invJ, dN_d_local)
 
 
 def calculate_element_matrices(
-    dN_d_x: np.matrix,
-    dN_d_y: np.matrix,
-    dN_d_z: np.matrix,
-    N_functions: np.matrix,
-    jacobians: List[Jacobian],
-    globalData: GlobalData,
-    element: Element,
-) -> tuple[np.matrix, np.matrix, np.matrix]:
-    H_matrix = np.zeros((8, 8))
-    C_matrix = np.zeros((8, 8))
-    P_source_vector = np.zeros(8)
-
-    density = globalData.Density
-    specific_heat = globalData.SpecificHeat
-
-    weights = GAUSS_QUADRATURE[NUMBER_OF_INTEGRATION_POINTS]["weights"]
-
-    for i in range(NUMBER_OF_INTEGRATION_POINTS):  # zeta
-        for j in range(NUMBER_OF_INTEGRATION_POINTS):  # eta
-            for k in range(NUMBER_OF_INTEGRATION_POINTS):  # xi
-                ip_index = (
-                    i * (NUMBER_OF_INTEGRATION_POINTS**2)
-                    + j * NUMBER_OF_INTEGRATION_POINTS
-                    + k
-                )
-                weight = weights[k] * weights[j] * weights[i]
-
-                detJ = jacobians[ip_index].detJ
-                partial_H = (
-                    (
-                        np.outer(dN_d_x[ip_index, :], dN_d_x[ip_index, :])
-                        + np.outer(dN_d_y[ip_index, :], dN_d_y[ip_index, :])
-                        + np.outer(dN_d_z[ip_index, :], dN_d_z[ip_index, :])
-                    )
-                    * element.k
-                    * weight
-                    * detJ
-                )
-
-                partial_C = (
-                    (np.outer(N_functions[ip_index, :], N_functions[ip_index, :]))
-                    * element.rho
-                    * element.cp
-                    * weight
-                    * detJ
-                )
-
-                H_matrix += partial_H
-                C_matrix += partial_C
-                P_source_vector += N_functions[ip_index, :] * element.Q * weight * detJ
-
-    return H_matrix, C_matrix, P_source_vector
+    universal_jacobian: UniversalJacobian,
+    jacobians: ElementJacobians,
+    k: np.ndarray,
+    rho_cp: np.ndarray,
+    Q: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Local H, C and source P for all elements at once.
+
+    k, rho_cp and Q are per-element vectors. Returns H and C with shape
+    (n_elem, 8, 8) and P with shape (n_elem, 8).
+    """
+    dN_d_global = transform_local_derivatives_to_global(
+        universal_jacobian.dN_d_local, jacobians.invJ
+    )
+    N_functions = universal_jacobian.N_functions
+    weighted_detJ = jacobians.detJ * universal_jacobian.weights
+
+    H_matrices = np.einsum(
+        "ep,epan,epam->enm",
+        weighted_detJ * k[:, None],
+        dN_d_global,
+        dN_d_global,
+        optimize=True,
+    )
+    C_matrices = np.einsum(
+        "ep,pn,pm->enm",
+        weighted_detJ * rho_cp[:, None],
+        N_functions,
+        N_functions,
+        optimize=True,
+    )
+    P_source_vectors = (weighted_detJ * Q[:, None]) @ N_functions
+
+    return H_matrices, C_matrices, P_source_vectors
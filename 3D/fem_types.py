@@ -1,16 +1,20 @@
 import numpy as np
 from dataclasses import dataclass
+from collections.abc import Sequence
 from typing import List
 
 
 @dataclass
-class Jacobian:
-    J: np.matrix
-    invJ: np.matrix
-    detJ: float
+class ElementJacobians:
+    J: np.ndarray  # (n_elem, n_ip, 3, 3)
+    invJ: np.ndarray  # (n_elem, n_ip, 3, 3)
+    detJ: np.ndarray  # (n_elem, n_ip)
 
     def __repr__(self):
-        return f"Jacobian(detJ={self.detJ}, J=\n{self.J}, invJ=\n{self.invJ})"
+        return (
+            f"ElementJacobians(elements={self.detJ.shape[0]}, "
+            f"points={self.detJ.shape[1]}, min detJ={self.detJ.min()})"
+        )
 
 
 @dataclass
@@ -25,7 +29,6 @@ class Node:
 @dataclass
 class Element:
     node_ids: List[int]
-    jacobian: List[Jacobian] = None
     k: float = 0.0
     rho: float = 0.0
     cp: float = 0.0
@@ -45,7 +48,108 @@ class GlobalData:
     WaterTemp: float
 
 
+class NodeView(Sequence):
+    """Read-only Node objects built on access from the grid arrays."""
+
+    def __init__(self, grid: "Grid"):
+        self._grid = grid
+
+    def __len__(self) -> int:
+        return self._grid.num_nodes
+
+    def __getitem__(self, index: int) -> Node:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        x, y, z = self._grid.coordinates[index].tolist()
+        return Node(
+            x,
+            y,
+            z,
+            convection_bc=bool(self._grid.convection_bc[index]),
+            dirichlet_bc=bool(self._grid.dirichlet_bc[index]),
+        )
+
+
+class ElementView(Sequence):
+    """Read-only Element objects (1-based node_ids) built on access."""
+
+    def __init__(self, grid: "Grid"):
+        self._grid = grid
+
+    def __len__(self) -> int:
+        return self._grid.num_elements
+
+    def __getitem__(self, index: int) -> Element:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        grid = self._grid
+        return Element(
+            (grid.connectivity[index] + 1).tolist(),
+            k=float(grid.k[index]),
+            rho=float(grid.rho[index]),
+            cp=float(grid.cp[index]),
+            Q=float(grid.Q[index]),
+        )
+
+
 @dataclass
 class Grid:
-    nodes: List[Node]
-    elements: List[Element]
+    """Structure-of-arrays mesh.
+
+    Connectivity is 0-based; `nodes` and `elements` expose Node/Element objects
+    for code written against the object representation.
+    """
+
+    coordinates: np.ndarray  # (n_nodes, 3)
+    connectivity: np.ndarray  # (n_elem, 8), int32, 0-based
+    convection_bc: np.ndarray  # (n_nodes,), bool
+    dirichlet_bc: np.ndarray  # (n_nodes,), bool
+    k: np.ndarray  # (n_elem,)
+    rho: np.ndarray  # (n_elem,)
+    cp: np.ndarray  # (n_elem,)
+    Q: np.ndarray  # (n_elem,) Heat generation per unit volume
+
+    def __post_init__(self):
+        self.coordinates = np.asarray(self.coordinates, dtype=float)
+        self.connectivity = np.asarray(self.connectivity, dtype=np.int32)
+        self.convection_bc = np.asarray(self.convection_bc, dtype=bool)
+        self.dirichlet_bc = np.asarray(self.dirichlet_bc, dtype=bool)
+        self.k = np.asarray(self.k, dtype=float)
+        self.rho = np.asarray(self.rho, dtype=float)
+        self.cp = np.asarray(self.cp, dtype=float)
+        self.Q = np.asarray(self.Q, dtype=float)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.coordinates)
+
+    @property
+    def num_elements(self) -> int:
+        return len(self.connectivity)
+
+    @property
+    def nodes(self) -> NodeView:
+        return NodeView(self)
+
+    @property
+    def elements(self) -> ElementView:
+        return ElementView(self)
+
+    def element_coordinates(self, element_ids: np.ndarray = None) -> np.ndarray:
+        """(n_elem, 8, 3) node coordinates of every element, or of element_ids."""
+        if element_ids is None:
+            return self.coordinates[self.connectivity]
+        return self.coordinates[self.connectivity[element_ids]]
+
+    @classmethod
+    def from_objects(cls, nodes: List[Node], elements: List[Element]) -> "Grid":
+        return cls(
+            coordinates=np.array([[n.x, n.y, n.z] for n in nodes]),
+            connectivity=np.array([e.node_ids for e in elements]) - 1,
+            convection_bc=np.array([n.convection_bc for n in nodes]),
+            dirichlet_bc=np.array([n.dirichlet_bc for n in nodes]),
+            k=np.array([e.k for e in elements]),
+            rho=np.array([e.rho for e in elements]),
+            cp=np.array([e.cp for e in elements]),
+            Q=np.array([e.Q for e in elements]),
+        )
@@ -0,0 +1,204 @@
+import os
+import struct
+from abc import ABC, abstractmethod
+from typing import BinaryIO, List, TextIO
+
+import numpy as np
+
+NPY_HEADER_SIZE = 128
+
+
+class HistorySink(ABC):
+    """Receives the saved time steps of a simulation as they are computed."""
+
+    @abstractmethod
+    def write(self, time: float, temperatures: np.ndarray) -> None: ...
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InMemoryHistory(HistorySink):
+    def __init__(self):
+        self.times: List[float] = []
+        self.steps: List[np.ndarray] = []
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        self.times.append(time)
+        self.steps.append(temperatures.copy())
+
+
+class MaxTemperatureTracker(HistorySink):
+    def __init__(self):
+        self.times: List[float] = []
+        self.max_temps: List[float] = []
+        self.min_temps: List[float] = []
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        self.times.append(time)
+        self.max_temps.append(float(np.max(temperatures)))
+        self.min_temps.append(float(np.min(temperatures)))
+
+
+class CsvHistoryWriter(HistorySink):
+    """Streams one CSV row per saved step; nothing is kept in memory."""
+
+    def __init__(self, path: str, num_nodes: int):
+        self.path = path
+        self._file: TextIO = open(path, "w")
+        self._step_idx = 0
+        self._file.write(
+            "TimeStep," + ",".join(f"Node_{i+1}" for i in range(num_nodes)) + "\n"
+        )
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        self._file.write(f"{self._step_idx},")
+        np.savetxt(self._file, temperatures[None, :], fmt="%.4f", delimiter=",")
+        self._step_idx += 1
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class AppendableNpy:
+    """A .npy file of float64 rows that grows along its first axis.
+
+    The header is padded to a fixed size and rewritten after every append, so
+    the file is a valid, memory-mappable .npy at all times.
+    """
+
+    def __init__(self, path: str, row_shape: tuple = ()):
+        self.path = path
+        self.row_shape = tuple(row_shape)
+        self.num_rows = 0
+        self._file: BinaryIO = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self) -> None:
+        # Right-aligned shape keeps the header length fixed as num_rows grows
+        shape = f"{(self.num_rows,) + self.row_shape!r:>40}"
+        header = f"{{'descr': '<f8', 'fortran_order': False, 'shape': {shape}, }}"
+        header_len = NPY_HEADER_SIZE - 10
+        header = header.ljust(header_len - 1) + "\n"
+        self._file.seek(0)
+        self._file.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", header_len))
+        self._file.write(header.encode("latin1"))
+        self._file.seek(0, 2)
+        self._file.flush()
+
+    def append(self, rows: np.ndarray) -> None:
+        rows = np.ascontiguousarray(rows, dtype="<f8")
+        self._file.write(rows.tobytes())
+        self.num_rows += rows.shape[0] if rows.ndim > len(self.row_shape) else 1
+        self._write_header()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class NpyHistoryWriter(HistorySink):
+    """Streams steps into a (time x node) float64 .npy.
+
+    Step times and per-step (min, max) go to small companion files so summaries
+    never need to touch the full history.
+    """
+
+    def __init__(self, base_path: str, num_nodes: int):
+        self.temperatures = AppendableNpy(history_path(base_path), (num_nodes,))
+        self.times = AppendableNpy(times_path(base_path))
+        self.stats = AppendableNpy(stats_path(base_path), (2,))
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        self.temperatures.append(temperatures)
+        self.times.append(np.array([time]))
+        self.stats.append(np.array([np.min(temperatures), np.max(temperatures)]))
+
+    def close(self) -> None:
+        self.temperatures.close()
+        self.times.close()
+        self.stats.close()
+
+
+def history_path(base_path: str) -> str:
+    return base_path + "_temperature_history.npy"
+
+
+def times_path(base_path: str) -> str:
+    return base_path + "_temperature_times.npy"
+
+
+def stats_path(base_path: str) -> str:
+    return base_path + "_temperature_stats.npy"
+
+
+class HistoryReader:
+    """Memory-mapped access to a history written by NpyHistoryWriter.
+
+    Indexing returns one step; node_series() returns one node over time. Only
+    the slices that are touched are read from disk.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.temperatures = np.load(history_path(base_path), mmap_mode="r")
+        self.times = np.load(times_path(base_path))
+        self._stats = None
+
+    @property
+    def num_nodes(self) -> int:
+        return self.temperatures.shape[1]
+
+    def __len__(self) -> int:
+        return self.temperatures.shape[0]
+
+    def __getitem__(self, index):
+        return self.temperatures[index]
+
+    def step(self, index: int) -> np.ndarray:
+        return np.array(self.temperatures[index])
+
+    def node_series(self, node_index: int) -> np.ndarray:
+        return np.array(self.temperatures[:, node_index])
+
+    def stats(self) -> np.ndarray:
+        """(steps, 2) array of per-step min and max temperature."""
+        if self._stats is None:
+            if os.path.exists(stats_path(self.base_path)):
+                self._stats = np.load(stats_path(self.base_path))
+            else:
+                self._stats = np.array(
+                    [[np.min(step), np.max(step)] for step in self.temperatures]
+                )
+        return self._stats
+
+    def min_temperatures(self) -> np.ndarray:
+        return self.stats()[:, 0]
+
+    def max_temperatures(self) -> np.ndarray:
+        return self.stats()[:, 1]
+
+    def export_csv(self, path: str) -> None:
+        with CsvHistoryWriter(path, self.num_nodes) as writer:
+            for time, temperatures in zip(self.times, self.temperatures):
+                writer.write(time, temperatures)
+
+
+class MultiSink(HistorySink):
+    def __init__(self, *sinks: HistorySink):
+        self.sinks = list(sinks)
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        for sink in self.sinks:
+            sink.write(time, temperatures)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
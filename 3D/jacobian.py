@@ -1,10 +1,9 @@
 from dataclasses import dataclass
-from typing import List
 import numpy as np
 
 from config import NUMBER_OF_INTEGRATION_POINTS
 from gauss_integration import GAUSS_QUADRATURE
-from fem_types import Jacobian, Node, Element, Grid
+from fem_types import ElementJacobians
 
 
 @dataclass
@@ -13,6 +12,8 @@ class UniversalJacobian:
     dN_d_eta: np.matrix
     dN_d_zeta: np.matrix
     N_functions: np.matrix
+    dN_d_local: np.ndarray  # (n_ip, 3, 8), stacked xi/eta/zeta derivatives
+    weights: np.ndarray  # (n_ip,), product Gauss weights
     num_points: int = NUMBER_OF_INTEGRATION_POINTS**3
 
     def __init__(self):
@@ -83,39 +84,41 @@ class UniversalJacobian:
 
                     idx += 1
 
+        self.dN_d_local = np.stack(
+            [self.dN_d_xi, self.dN_d_eta, self.dN_d_zeta], axis=1
+        )
+        # Same ordering as idx above: zeta slowest, xi fastest
+        gauss_weights = np.array(
+            GAUSS_QUADRATURE[NUMBER_OF_INTEGRATION_POINTS]["weights"]
+        )
+        self.weights = np.einsum(
+            "i,j,k->ijk", gauss_weights, gauss_weights, gauss_weights
+        ).ravel()
+
+
+def find_degenerate_elements(detJ: np.ndarray, tolerance: float = 1e-15) -> np.ndarray:
+    return np.flatnonzero(np.any(detJ <= tolerance, axis=1))
+
 
-def calculate_jacobian_for_finite_element(
-    element: Element,
-    grid: Grid,
+def report_degenerate_elements(element_ids: np.ndarray) -> None:
+    if len(element_ids) > 0:
+        print(
+            f"CRITICAL ERROR: {len(element_ids)} element(s) have detJ <= 0, "
+            f"indices: {np.asarray(element_ids).tolist()}"
+        )
+
+
+def calculate_jacobians(
+    element_coordinates: np.ndarray,
     universal_jacobian: UniversalJacobian,
-) -> List[Jacobian]:
-    nodes_x = np.array([grid.nodes[n_id - 1].x for n_id in element.node_ids])
-    nodes_y = np.array([grid.nodes[n_id - 1].y for n_id in element.node_ids])
-    nodes_z = np.array([grid.nodes[n_id - 1].z for n_id in element.node_ids])
-    jacobians = []
-
-    for integration_point_index in range(universal_jacobian.num_points):
-        dN_d_xi = universal_jacobian.dN_d_xi[integration_point_index, :]
-        dN_d_eta = universal_jacobian.dN_d_eta[integration_point_index, :]
-        dN_d_zeta = universal_jacobian.dN_d_zeta[integration_point_index, :]
-
-        J = np.zeros((3, 3))
-        J[0, 0] = np.sum(dN_d_xi * nodes_x)  # dx/d_xi
-        J[0, 1] = np.sum(dN_d_xi * nodes_y)  # dy/d_xi
-        J[0, 2] = np.sum(dN_d_xi * nodes_z)  # dz/d_xi
-
-        J[1, 0] = np.sum(dN_d_eta * nodes_x)  # dx/d_eta
-        J[1, 1] = np.sum(dN_d_eta * nodes_y)  # dy/d_eta
-        J[1, 2] = np.sum(dN_d_eta * nodes_z)  # dz/d_eta
-
-        J[2, 0] = np.sum(dN_d_zeta * nodes_x)  # dx/d_zeta
-        J[2, 1] = np.sum(dN_d_zeta * nodes_y)  # dy/d_zeta
-        J[2, 2] = np.sum(dN_d_zeta * nodes_z)  # dz/d_zeta
-
-        if np.linalg.det(J) <= 1e-15:
-            print(
-                f"CRITICAL ERROR: Element {element.node_ids} has detJ = {np.linalg.det(J)}!"
-            )
-        jacobians.append(Jacobian(J=J, invJ=np.linalg.inv(J), detJ=np.linalg.det(J)))
-
-    return jacobians
+) -> ElementJacobians:
+    """Jacobians of all elements at all integration points.
+
+    element_coordinates has shape (n_elem, 8, 3); J and invJ are returned with
+    shape (n_elem, n_ip, 3, 3) and detJ with shape (n_elem, n_ip).
+    J[e, p, a, b] is the derivative of coordinate b over local coordinate a.
+    """
+    J = np.einsum("pan,enb->epab", universal_jacobian.dN_d_local, element_coordinates)
+    detJ = np.linalg.det(J)
+
+    return ElementJacobians(J=J, invJ=np.linalg.inv(J), detJ=detJ)
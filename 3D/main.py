@@ -1,28 +1,50 @@
+import argparse
 import sys
 import os
 import glob
 import time
 import multiprocessing
-import numpy as np
 from tqdm import tqdm
 
-from fem_types import GlobalData
-from mesh_generator.mesh_generator import MeshGeneratorBuilder, PastePattern
+from mesh_generator.mesh_generator import PastePattern
 from config import (
-    MULTIPROCESSING_ENABLED,
     MAX_PROCESSES,
+    MULTIPROCESSING_ENABLED,
+    THREADS_PER_PROCESS,
     RUN_ALL_PATTERNS,
     SAVE_TO_CSV,
+    SAVE_TO_NPY,
     PLOT_MAX,
     PLOT_GRID,
 )
 from config_loader import ConfigLoader
 from simulate import simulate
+from system_cache import default_cache, load_or_assemble
+from shared_system import SharedArrays, SharedSpec, pattern_system, share_pattern_base
+from scheduler import SimulationTask, build_tasks, run_tasks
+from concurrency import plan_concurrency
+from history import (
+    CsvHistoryWriter,
+    InMemoryHistory,
+    MaxTemperatureTracker,
+    MultiSink,
+    NpyHistoryWriter,
+)
 from plot_grid import plot_grid
+from results import RunResult, save_mesh
 from plot_max import plot_max_temperature
 
 
-def run_simulation_task(config_file: str, paste_pattern: PastePattern = None) -> str:
+def run_simulation_task(
+    config_file: str,
+    paste_pattern: PastePattern = None,
+    shared_base: SharedSpec = None,
+) -> str:
+    """Runs one configuration and writes its results to output/.
+
+    shared_base is the spec of a share_pattern_base() for the same config; the
+    task then only assembles the paste layer of its pattern on top of it.
+    """
     process_name = multiprocessing.current_process().name
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_dir = os.path.join(script_dir, "output")
@@ -39,86 +61,113 @@ def run_simulation_task(config_file: str, paste_pattern: PastePattern = None) ->
     start_time = time.time()
 
     try:
-        generator = (
-            MeshGeneratorBuilder()
-            .set_parameters(cfg.geometry.width, cfg.geometry.depth, cfg.geometry.height)
-            .set_resolution(cfg.geometry.nx, cfg.geometry.ny, cfg.geometry.nz)
-            .set_die_size(cfg.geometry.die_width, cfg.geometry.die_depth)
-            .set_materials(cfg.materials)
-            .set_layers(cfg.layers)
-            .set_power(cfg.power)
-            .set_paste_pattern(paste_pattern if paste_pattern else cfg.paste_pattern)
-            .build()
-        )
+        generator = cfg.mesh_generator(paste_pattern)
 
-        grid = generator.generate_grid()
+        if shared_base is not None:
+            grid, assembled = pattern_system(
+                SharedArrays.attach(shared_base), generator, generator.pattern
+            )
+        else:
+            grid, assembled = load_or_assemble(generator, default_cache())
     except Exception as e:
-        return f"[{process_name}] ERROR generating grid for {config_file}: {e}"
-
-    global_data = GlobalData(
-        SimulationTime=cfg.simulation.sim_time,
-        SimulationStepTime=cfg.simulation.step_time,
-        InitialTemp=cfg.simulation.initial_temp,
-        Alpha=cfg.simulation.alpha,
-        Tenv=cfg.simulation.ambient_temp,
-        WaterTemp=cfg.simulation.water_temp,
-        Conductivity=0,
-        Density=0,
-        SpecificHeat=0,
-    )
+        return f"[{process_name}] ERROR building system for {config_file}: {e}"
+
+    global_data = cfg.global_data()
+
+    tracker = MaxTemperatureTracker()
+    sinks = [tracker]
+    if SAVE_TO_NPY:
+        sinks.append(NpyHistoryWriter(output_path_base, grid.num_nodes))
+    if SAVE_TO_CSV:
+        sinks.append(
+            CsvHistoryWriter(
+                output_path_base + "_temperature_history.csv", grid.num_nodes
+            )
+        )
+    if PLOT_GRID and not SAVE_TO_NPY:
+        # Without the stored history the slider needs every step in memory
+        in_memory = InMemoryHistory()
+        sinks.append(in_memory)
 
     try:
-        simulation_history = simulate(grid, global_data)
+        with MultiSink(*sinks) as sink:
+            simulate(
+                grid,
+                global_data,
+                cfg.simulation.solver,
+                sink=sink,
+                assembled=assembled,
+                time_stepping=cfg.simulation.time_stepping,
+                mode=cfg.simulation.mode,
+            )
     except Exception as e:
         return f"[{process_name}] ERROR running simulation {config_file}: {e}"
 
     duration = time.time() - start_time
 
-    final_step = simulation_history[-1]
-    max_temp = np.max(final_step)
+    max_temp = tracker.max_temps[-1]
     output_filename = output_path_base + "_result.txt"
     with open(output_filename, "w") as f:
         f.write(f"Source Config: {config_file}\n")
         f.write(
             f"Pattern: {paste_pattern.name if paste_pattern else cfg.paste_pattern.name}\n"
         )
-        f.write(f"Nodes: {len(grid.nodes)}\n")
+        f.write(f"Nodes: {grid.num_nodes}\n")
         f.write(f"Max Temp Reached: {max_temp:.2f} C\n")
+        if cfg.simulation.mode == "steady":
+            f.write("Time Reached: steady state\n")
+        else:
+            f.write(f"Time Reached: {tracker.times[-1]:.2f} s\n")
         f.write(f"Compute Time: {duration:.2f} s\n")
 
-    if SAVE_TO_CSV:
-        csv_filename = output_path_base + "_temperature_history.csv"
-        with open(csv_filename, "w") as f:
-            header = (
-                "TimeStep,"
-                + ",".join(f"Node_{i+1}" for i in range(len(grid.nodes)))
-                + "\n"
-            )
-            f.write(header)
-            for step_idx, temps in enumerate(simulation_history):
-                line = f"{step_idx}," + ",".join(f"{temp:.4f}" for temp in temps) + "\n"
-                f.write(line)
+    if SAVE_TO_NPY:
+        save_mesh(grid, output_path_base)
 
     if PLOT_GRID:
-        plot_grid(grid, simulation_history)
+        if SAVE_TO_NPY:
+            RunResult(output_path_base).plot_grid()
+        else:
+            plot_grid(grid, in_memory.steps)
 
     if PLOT_MAX:
-        times = [
-            i * global_data.SimulationStepTime for i in range(len(simulation_history))
-        ]
-        max_temps = [np.max(step) for step in simulation_history]
         plot_max_temperature(
-            output_path_base, os.path.basename(config_file), times, max_temps
+            output_path_base,
+            os.path.basename(config_file),
+            tracker.times,
+            tracker.max_temps,
         )
 
     return f"[{process_name}] DONE: {os.path.basename(config_file)} -> MaxT: {max_temp:.1f}C ({duration:.1f}s)"
 
 
+def run_task(task: SimulationTask) -> str:
+    return run_simulation_task(task.config_file, task.paste_pattern, task.shared_base)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run thermal simulations.")
+    parser.add_argument(
+        "configs",
+        nargs="*",
+        help="Config files (default: every .toml in simulations/)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=MAX_PROCESSES if MULTIPROCESSING_ENABLED else 1,
+        help="Maximum number of worker processes",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=THREADS_PER_PROCESS,
+        help="BLAS/OpenMP threads per process (0: CPUs / processes)",
+    )
+    args = parser.parse_args()
     files_to_run = []
 
-    if len(sys.argv) > 1:
-        files_to_run = sys.argv[1:]
+    if args.configs:
+        files_to_run = args.configs
     else:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         sim_dir = os.path.join(script_dir, "simulations")
@@ -139,49 +188,52 @@ if __name__ == "__main__":
         print(f" - {f}")
     print("-" * 40)
 
+    tasks = build_tasks(files_to_run, RUN_ALL_PATTERNS)
+    plan = plan_concurrency(len(tasks), args.processes, args.threads)
+    num_workers = plan.processes
+    print(f"--- {len(tasks)} tasks on {plan} ---")
+
     start_global = time.time()
 
-    if MULTIPROCESSING_ENABLED:
-        num_cores = max(1, min(multiprocessing.cpu_count() - 1, MAX_PROCESSES))
-        total_tasks = len(files_to_run)
-        if RUN_ALL_PATTERNS:
-            total_tasks *= len(PastePattern)
-        num_workers = min(num_cores, len(files_to_run))
-
-        with multiprocessing.Pool(processes=num_workers) as pool:
-            results = []
-            if RUN_ALL_PATTERNS:
-                tasks = []
-                for file in files_to_run:
-                    for pattern in PastePattern:
-                        tasks.append((file, pattern))
-                for result in tqdm(
-                    pool.starmap(run_simulation_task, tasks),
-                    total=len(tasks),
-                    desc="Simulations Progress",
-                ):
-                    results.append(result)
-            else:
-                for result in tqdm(
-                    pool.imap_unordered(run_simulation_task, files_to_run),
-                    total=len(files_to_run),
-                    desc="Simulations Progress",
-                ):
-                    results.append(result)
-    else:
-        results = []
-        for file in tqdm(files_to_run, desc="Simulations Progress"):
-            if RUN_ALL_PATTERNS:
-                for pattern in PastePattern:
-                    result = run_simulation_task(file, paste_pattern=pattern)
-                    results.append(result)
-            else:
-                result = run_simulation_task(file)
+    shared_bases = []
+    if RUN_ALL_PATTERNS and num_workers > 1:
+        # Mesh and non-paste matrices are built once per config and shared;
+        # each pattern task only assembles its own paste layer
+        for file in files_to_run:
+            try:
+                cfg = ConfigLoader.load_from_file(file)
+                base = share_pattern_base(cfg.mesh_generator())
+            except Exception as e:
+                print(f"Warning: Could not share the mesh of {file}: {e}")
+                continue
+            shared_bases.append(base)
+            for task in tasks:
+                if task.config_file == file:
+                    task.shared_base = base.spec
+
+    results = []
+    failures = []
+    try:
+        with tqdm(total=len(tasks), desc="Simulations Progress") as progress:
+            for task, result in run_tasks(
+                run_task,
+                tasks,
+                num_workers,
+                threads_per_process=plan.threads_per_process,
+            ):
                 results.append(result)
+                if " ERROR " in result:
+                    failures.append(result)
+                tqdm.write(result)
+                progress.update(1)
+    finally:
+        for base in shared_bases:
+            base.unlink()
     total_time = time.time() - start_global
 
     print("\n--- All Simulations Finished ---")
     print(f"Total batch time: {total_time:.2f} s")
+    print(f"Failed: {len(failures)} of {len(tasks)}")
     print("\nResults Summary:")
     for res in sorted(results):
         print(res)
@@ -2,7 +2,7 @@ from __future__ import annotations
 import numpy as np
 from dataclasses import dataclass
 from enum import Enum
-from fem_types import Grid, Node, Element
+from fem_types import Grid
 from units import Distance
 from config import DEBUG, ENTIRE_RADIATOR_HAS_DERICHLET_BC
 
@@ -48,6 +48,65 @@ class GeometryParameters:
     nz: int = 30
     die_width: float = Distance.mm(15)
     die_depth: float = Distance.mm(12)
+    grading: bool = False  # Coarsen away from the die and the thin layers
+    growth_ratio: float = 1.2  # Size ratio of neighbouring graded elements
+    max_ratio: float = 8.0  # Largest graded element / uniform element size
+
+
+def graded_sizes(
+    length: float, spacing: float, growth_ratio: float, max_size: float
+) -> np.ndarray:
+    """Element sizes that grow geometrically from spacing over length.
+
+    Every element is at most growth_ratio times its neighbour towards the
+    uniform region (the first one relative to spacing) and at most max_size.
+    The fewest elements that can cover length within those limits share one
+    growth rate, chosen so that they add up to length. A span too short for
+    that many elements of at least spacing gets equal, smaller elements.
+    """
+    if length <= spacing * 1e-9:
+        return np.zeros(0)
+
+    def run(ratio: float, count: int) -> np.ndarray:
+        return np.minimum(spacing * ratio ** np.arange(1, count + 1), max_size)
+
+    count = 1
+    while run(growth_ratio, count).sum() < length * (1 - 1e-12):
+        count += 1
+
+    if count * spacing >= length:
+        sizes = np.full(count, length / count)
+    else:
+        # The total grows with the rate: bisect between uniform and growth_ratio
+        low, high = 1.0, growth_ratio
+        for _ in range(60):
+            ratio = (low + high) / 2
+            if run(ratio, count).sum() < length:
+                low = ratio
+            else:
+                high = ratio
+        sizes = run(high, count)
+        sizes *= length / sizes.sum()
+
+    check_graded_sizes(sizes, spacing, growth_ratio, max_size)
+    return sizes
+
+
+def check_graded_sizes(
+    sizes: np.ndarray, spacing: float, growth_ratio: float, max_size: float
+) -> None:
+    neighbours = np.concatenate([[spacing], sizes[:-1]])
+    tolerance = 1 + 1e-9
+    if np.any(sizes > max_size * tolerance) or np.any(
+        sizes > growth_ratio * neighbours * tolerance
+    ):
+        raise ValueError(
+            "Error: Graded element sizes exceed growth_ratio or max_ratio."
+        )
+
+
+def node_positions(start: float, sizes: np.ndarray) -> np.ndarray:
+    return start + np.concatenate([[0.0], np.cumsum(sizes)])
 
 
 class MeshGeneratorBuilder:
@@ -93,6 +152,14 @@ class MeshGeneratorBuilder:
         self._pattern = paste_pattern
         return self
 
+    def set_grading(
+        self, grading: bool, growth_ratio: float = 1.2, max_ratio: float = 8.0
+    ) -> MeshGeneratorBuilder:
+        self._geometry.grading = grading
+        self._geometry.growth_ratio = growth_ratio
+        self._geometry.max_ratio = max_ratio
+        return self
+
     def build(self) -> MeshGenerator:
         if (
             self._geometry.width < self._geometry.die_width
@@ -103,6 +170,8 @@ class MeshGeneratorBuilder:
             raise ValueError("Error: Material configuration not set.")
         if self._layers is None:
             raise ValueError("Error: Layer configuration not set.")
+        if self._geometry.growth_ratio < 1 or self._geometry.max_ratio < 1:
+            raise ValueError("Error: growth_ratio and max_ratio must be at least 1.")
 
         return MeshGenerator(
             self._geometry, self._materials, self._layers, self._power, self._pattern
@@ -129,24 +198,100 @@ class MeshGenerator:
         self.dy = self.geo.depth / self.geo.ny
         self.dz = self.geo.height / self.geo.nz
 
-    def generate_grid(self) -> Grid:
-        print(
-            f"Generating 3D mesh: {self.geo.nx}x{self.geo.ny}x{self.geo.nz} elements..."
+        # Node coordinates along each axis; the grid is their tensor product
+        if self.geo.grading:
+            self.x_nodes = self._graded_plane_axis(
+                self.geo.width, self.geo.die_width, self.dx
+            )
+            self.y_nodes = self._graded_plane_axis(
+                self.geo.depth, self.geo.die_depth, self.dy
+            )
+            self.z_nodes = self._graded_height_axis()
+        else:
+            self.x_nodes = np.arange(self.geo.nx + 1) * self.dx
+            self.y_nodes = np.arange(self.geo.ny + 1) * self.dy
+            self.z_nodes = np.arange(self.geo.nz + 1) * self.dz
+        self.nx = len(self.x_nodes) - 1
+        self.ny = len(self.y_nodes) - 1
+        self.nz = len(self.z_nodes) - 1
+
+    @property
+    def num_nodes(self) -> int:
+        return (self.nx + 1) * (self.ny + 1) * (self.nz + 1)
+
+    def _graded_plane_axis(
+        self, length: float, die_length: float, spacing: float
+    ) -> np.ndarray:
+        """Uniform spacing across the die, coarsening towards both sides."""
+        die_start = (length - die_length) / 2
+        num_die = max(1, int(np.ceil(die_length / spacing - 1e-9)))
+        side = graded_sizes(
+            die_start, spacing, self.geo.growth_ratio, self.geo.max_ratio * spacing
+        )
+        sizes = np.concatenate(
+            [side[::-1], np.full(num_die, die_length / num_die), side]
+        )
+        return node_positions(0.0, sizes)
+
+    def _graded_height_axis(self) -> np.ndarray:
+        """Uniform spacing through silicon, IHS and paste, coarsening to the top.
+
+        The layers keep the element counts and thicknesses of the uniform mesh.
+        """
+        _, _, idx_paste_end = self.layer_ends()
+        layers = np.arange(idx_paste_end + 1) * self.dz
+        heatsink = graded_sizes(
+            self.geo.height - layers[-1],
+            self.dz,
+            self.geo.growth_ratio,
+            self.geo.max_ratio * self.dz,
+        )
+        return np.concatenate([layers, node_positions(layers[-1], heatsink)[1:]])
+
+    def layer_ends(self) -> tuple[int, int, int]:
+        """Element k index one past the silicon, IHS and paste layers."""
+        n_silicon = max(1, int(self.geo.nz * (self.layers.silicon / 100)))
+        n_ihs = max(1, int(self.geo.nz * (self.layers.ihs / 100)))
+        n_paste = max(1, int(self.geo.nz * (self.layers.paste / 100)))
+        return n_silicon, n_silicon + n_ihs, n_silicon + n_ihs + n_paste
+
+    def paste_layer_elements(self) -> np.ndarray:
+        """Ids of the elements whose material depends on the paste pattern."""
+        _, idx_ihs_end, idx_paste_end = self.layer_ends()
+        per_layer = self.nx * self.ny
+        return np.arange(idx_ihs_end * per_layer, idx_paste_end * per_layer)
+
+    def paste_layer_materials(
+        self, pattern: PastePattern = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """k, rho and cp of the paste layer elements for a pattern.
+
+        Defaults to the generator's own pattern; the order matches
+        paste_layer_elements().
+        """
+        pattern = self.pattern if pattern is None else pattern
+        per_layer = self.nx * self.ny
+        in_layer = self.paste_layer_elements() % per_layer
+        center_x = self._centers(self.x_nodes)[in_layer % self.nx]
+        center_y = self._centers(self.y_nodes)[in_layer // self.nx]
+        has_paste = self._is_paste_at(center_x, center_y, pattern)
+
+        paste, air = self.materials.paste, self.materials.air
+        return (
+            np.where(has_paste, paste.k, air.k),
+            np.where(has_paste, paste.rho, air.rho),
+            np.where(has_paste, paste.cp, air.cp),
         )
 
-        n_silicon = int(self.geo.nz * (self.layers.silicon / 100))
-        n_ihs = int(self.geo.nz * (self.layers.ihs / 100))
-        n_paste = int(self.geo.nz * (self.layers.paste / 100))
-
-        n_silicon = max(1, n_silicon)
-        n_ihs = max(1, n_ihs)
-        n_paste = max(1, n_paste)
-
-        n_heatsink = self.geo.nz - n_silicon - n_ihs - n_paste
-
-        idx_silicon_end = n_silicon
-        idx_ihs_end = idx_silicon_end + n_ihs
-        idx_paste_end = idx_ihs_end + n_paste
+    def generate_grid(self) -> Grid:
+        grading = " (graded)" if self.geo.grading else ""
+        print(f"Generating 3D mesh: {self.nx}x{self.ny}x{self.nz} elements{grading}...")
+
+        idx_silicon_end, idx_ihs_end, idx_paste_end = self.layer_ends()
+        n_silicon = idx_silicon_end
+        n_ihs = idx_ihs_end - idx_silicon_end
+        n_paste = idx_paste_end - idx_ihs_end
+        n_heatsink = self.nz - idx_paste_end
         idx_radiator_start = idx_paste_end
 
         print(f"Layer distribution (k indices):")
@@ -155,11 +300,9 @@ class MeshGenerator:
         print(
             f" - Paste:    {idx_ihs_end} to {idx_paste_end - 1} \t({n_paste} layers) -> Pattern: {self.pattern}"
         )
-        print(
-            f" - Heatsink: {idx_paste_end} to {self.geo.nz - 1} \t({n_heatsink} layers)"
-        )
+        print(f" - Heatsink: {idx_paste_end} to {self.nz - 1} \t({n_heatsink} layers)")
 
-        if n_heatsink < 0:
+        if self.geo.nz < idx_paste_end:
             raise ValueError(
                 "Error: Layer configuration results in negative heatsink layers. Increase nz."
             )
@@ -169,132 +312,139 @@ class MeshGenerator:
         print(f"Heat Source Power: {self.power} W")
         print(f"Heat Source Density (Q): {silicon_Q/1e6:.2f} MW/m^3")
 
-        nodes = []
-        elements = []
-        node_id_counter = 1
-        nodes_map = np.zeros(
-            (self.geo.nx + 1, self.geo.ny + 1, self.geo.nz + 1), dtype=int
+        nx, ny, nz = self.nx, self.ny, self.nz
+
+        # Nodes are numbered with i (x) fastest, then j (y), then k (z)
+        k_n, j_n, i_n = np.meshgrid(
+            np.arange(nz + 1), np.arange(ny + 1), np.arange(nx + 1), indexing="ij"
+        )
+        k_n, j_n, i_n = k_n.ravel(), j_n.ravel(), i_n.ravel()
+        coordinates = np.stack(
+            [self.x_nodes[i_n], self.y_nodes[j_n], self.z_nodes[k_n]], axis=1
+        )
+
+        is_side_x = (i_n == 0) | (i_n == nx)
+        is_side_y = (j_n == 0) | (j_n == ny)
+        is_top = k_n == nz
+        in_radiator_zone = k_n >= idx_radiator_start
+
+        dirichlet_bc = is_top | (in_radiator_zone & ENTIRE_RADIATOR_HAS_DERICHLET_BC)
+        convection_bc = ~dirichlet_bc & (is_side_x | is_side_y)
+
+        # Elements follow the same k, j, i order as the nodes
+        k_e, j_e, i_e = np.meshgrid(
+            np.arange(nz), np.arange(ny), np.arange(nx), indexing="ij"
+        )
+        k_e, j_e, i_e = k_e.ravel(), j_e.ravel(), i_e.ravel()
+
+        stride_j = nx + 1
+        stride_k = (nx + 1) * (ny + 1)
+        base = i_e + stride_j * j_e + stride_k * k_e
+        corner_offsets = np.array(
+            [
+                0,
+                1,
+                1 + stride_j,
+                stride_j,
+                stride_k,
+                stride_k + 1,
+                stride_k + 1 + stride_j,
+                stride_k + stride_j,
+            ]
         )
+        connectivity = base[:, None] + corner_offsets[None, :]
+
+        center_x = self._centers(self.x_nodes)[i_e]
+        center_y = self._centers(self.y_nodes)[j_e]
+
+        in_silicon = k_e < idx_silicon_end
+        in_ihs = (k_e >= idx_silicon_end) & (k_e < idx_ihs_end)
+        in_heatsink = k_e >= idx_paste_end
+
+        inside_die = self._is_inside_die(center_x, center_y)
+
+        num_elements = len(base)
+        k = np.zeros(num_elements)
+        rho = np.zeros(num_elements)
+        cp = np.zeros(num_elements)
+        Q = np.zeros(num_elements)
+
+        for mask, material in (
+            (in_silicon & inside_die, self.materials.silicon),
+            (in_silicon & ~inside_die, self.materials.substrate),
+            (in_ihs, self.materials.ihs),
+            (in_heatsink, self.materials.heatsink),
+        ):
+            k[mask] = material.k
+            rho[mask] = material.rho
+            cp[mask] = material.cp
+        Q[in_silicon & inside_die] = silicon_Q
+
+        paste_elements = self.paste_layer_elements()
+        k[paste_elements], rho[paste_elements], cp[paste_elements] = (
+            self.paste_layer_materials()
+        )
+
+        if DEBUG:
+            center = (k_e == 0) & (i_e == nx // 2) & (j_e == ny // 2)
+            if np.any(center & inside_die):
+                print(f"DEBUG: Center element is Silicon Source")
+
+        grid = Grid(
+            coordinates=coordinates,
+            connectivity=connectivity,
+            convection_bc=convection_bc,
+            dirichlet_bc=dirichlet_bc,
+            k=k,
+            rho=rho,
+            cp=cp,
+            Q=Q,
+        )
+        print(
+            f"Finished. Generated {len(coordinates)} nodes and {num_elements} elements."
+        )
+        return grid
+
+    @staticmethod
+    def _centers(nodes: np.ndarray) -> np.ndarray:
+        return (nodes[:-1] + nodes[1:]) / 2
 
-        for k in range(self.geo.nz + 1):
-            for j in range(self.geo.ny + 1):
-                for i in range(self.geo.nx + 1):
-                    x = i * self.dx
-                    y = j * self.dy
-                    z = k * self.dz
-
-                    new_node = Node(x, y, z)
-
-                    is_side_x = i == 0 or i == self.geo.nx
-                    is_side_y = j == 0 or j == self.geo.ny
-                    is_top = k == self.geo.nz
-                    in_radiator_zone = k >= idx_radiator_start
-
-                    new_node.dirichlet_bc = False
-                    new_node.convection_bc = False
-
-                    if is_top or (
-                        in_radiator_zone and ENTIRE_RADIATOR_HAS_DERICHLET_BC
-                    ):
-                        new_node.dirichlet_bc = True
-                    elif is_side_x or is_side_y:
-                        new_node.convection_bc = True
-
-                    nodes.append(new_node)
-                    nodes_map[i, j, k] = node_id_counter
-                    node_id_counter += 1
-
-        for k in range(self.geo.nz):
-            for j in range(self.geo.ny):
-                for i in range(self.geo.nx):
-                    n_ids = [
-                        nodes_map[i, j, k],
-                        nodes_map[i + 1, j, k],
-                        nodes_map[i + 1, j + 1, k],
-                        nodes_map[i, j + 1, k],
-                        nodes_map[i, j, k + 1],
-                        nodes_map[i + 1, j, k + 1],
-                        nodes_map[i + 1, j + 1, k + 1],
-                        nodes_map[i, j + 1, k + 1],
-                    ]
-                    element = Element(n_ids)
-                    center_x = (i + 0.5) * self.dx
-                    center_y = (j + 0.5) * self.dy
-
-                    if k < idx_silicon_end:
-                        if self._is_inside_die(center_x, center_y):
-                            element.Q = silicon_Q
-                            element.k = self.materials.silicon.k
-                            element.rho = self.materials.silicon.rho
-                            element.cp = self.materials.silicon.cp
-                            if (
-                                DEBUG
-                                and k == 0
-                                and i == self.geo.nx // 2
-                                and j == self.geo.ny // 2
-                            ):
-                                print(f"DEBUG: Center element is Silicon Source")
-                        else:
-                            element.k = self.materials.substrate.k
-                            element.rho = self.materials.substrate.rho
-                            element.cp = self.materials.substrate.cp
-
-                    elif k < idx_ihs_end:
-                        element.k = self.materials.ihs.k
-                        element.rho = self.materials.ihs.rho
-                        element.cp = self.materials.ihs.cp
-
-                    elif k < idx_paste_end:
-                        if self._is_paste_at(center_x, center_y, self.pattern):
-                            element.k = self.materials.paste.k
-                            element.rho = self.materials.paste.rho
-                            element.cp = self.materials.paste.cp
-                        else:
-                            element.k = self.materials.air.k
-                            element.rho = self.materials.air.rho
-                            element.cp = self.materials.air.cp
-
-                    else:
-                        element.k = self.materials.heatsink.k
-                        element.rho = self.materials.heatsink.rho
-                        element.cp = self.materials.heatsink.cp
-
-                    elements.append(element)
-
-        print(f"Finished. Generated {len(nodes)} nodes and {len(elements)} elements.")
-        return Grid(nodes, elements)
-
-    def _is_inside_die(self, x: float, y: float) -> bool:
+    def _is_inside_die(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
         cx = self.geo.width / 2
         cy = self.geo.depth / 2
         half_w = self.geo.die_width / 2
         half_d = self.geo.die_depth / 2
-        return (cx - half_w) <= x <= (cx + half_w) and (cy - half_d) <= y <= (
-            cy + half_d
+        return (
+            ((cx - half_w) <= x)
+            & (x <= (cx + half_w))
+            & ((cy - half_d) <= y)
+            & (y <= (cy + half_d))
         )
 
-    def _is_paste_at(self, x: float, y: float, pattern: PastePattern) -> bool:
+    def _is_paste_at(
+        self, x: np.ndarray, y: np.ndarray, pattern: PastePattern
+    ) -> np.ndarray:
         cx = self.geo.width / 2
         cy = self.geo.depth / 2
 
         if pattern == PastePattern.FULL:
-            return True
+            return np.ones(np.shape(x), dtype=bool)
         elif pattern == PastePattern.DOT:
             radius = min(self.geo.die_width, self.geo.die_depth) * 0.8
             dist = np.sqrt((x - cx) ** 2 + (y - cy) ** 2)
             return dist <= radius
         elif pattern == PastePattern.X_SHAPE:
             line_width = self.geo.die_width * 0.15
-            dist1 = abs((x - cx) - (y - cy)) / np.sqrt(2)
-            dist2 = abs((x - cx) + (y - cy)) / np.sqrt(2)
-            return dist1 < line_width or dist2 < line_width
+            dist1 = np.abs((x - cx) - (y - cy)) / np.sqrt(2)
+            dist2 = np.abs((x - cx) + (y - cy)) / np.sqrt(2)
+            return (dist1 < line_width) | (dist2 < line_width)
 
         elif pattern == PastePattern.TWO_LINES:
             line_thickness = self.geo.die_width * 0.1
             pos1 = cx - (self.geo.die_width * 0.25)
             pos2 = cx + (self.geo.die_width * 0.25)
-            is_line1 = abs(x - pos1) < (line_thickness / 2)
-            is_line2 = abs(x - pos2) < (line_thickness / 2)
-            return is_line1 or is_line2
+            is_line1 = np.abs(x - pos1) < (line_thickness / 2)
+            is_line2 = np.abs(x - pos2) < (line_thickness / 2)
+            return is_line1 | is_line2
 
-        return False
+        return np.zeros(np.shape(x), dtype=bool)
@@ -1,30 +1,38 @@
 from fem_types import Grid
 import pyvista as pv
 import numpy as np
-from typing import List
+from typing import Sequence
 
 
-def plot_grid(grid: Grid, results_history: List[np.ndarray]) -> None:
-    points = np.array([[n.x, n.y, n.z] for n in grid.nodes])
-    cells = []
-    cell_type_array = []
-    sample_element_len = len(grid.elements[0].node_ids)
+def plot_grid(
+    grid: Grid,
+    results_history: Sequence[np.ndarray],
+    temperature_range: tuple[float, float] = None,
+) -> None:
+    """Interactive view of the temperature field with a time step slider.
 
-    vtk_type = pv.CellType.HEXAHEDRON if sample_element_len == 8 else pv.CellType.TETRA
+    results_history may be a HistoryReader; steps are then read on demand.
+    """
+    points = grid.coordinates
+    sample_element_len = grid.connectivity.shape[1]
 
-    for element in grid.elements:
-        cells.append(sample_element_len)
-        for nid in element.node_ids:
-            cells.append(nid - 1)
-        cell_type_array.append(vtk_type)
+    vtk_type = pv.CellType.HEXAHEDRON if sample_element_len == 8 else pv.CellType.TETRA
 
-    cells = np.array(cells)
-    cell_type_array = np.array(cell_type_array)
+    cells = np.hstack(
+        [
+            np.full((grid.num_elements, 1), sample_element_len, dtype=np.int64),
+            grid.connectivity,
+        ]
+    ).ravel()
+    cell_type_array = np.full(grid.num_elements, vtk_type, dtype=np.uint8)
     mesh = pv.UnstructuredGrid(cells, cell_type_array, points)
 
-    global_min = min(np.min(step) for step in results_history)
-    global_max = max(np.max(step) for step in results_history)
-    mesh.point_data["Temperature"] = results_history[0]
+    if temperature_range is None:
+        global_min = min(np.min(step) for step in results_history)
+        global_max = max(np.max(step) for step in results_history)
+    else:
+        global_min, global_max = temperature_range
+    mesh.point_data["Temperature"] = np.asarray(results_history[0])
 
     plotter = pv.Plotter()
 
@@ -38,7 +46,7 @@ def plot_grid(grid: Grid, results_history: List[np.ndarray]) -> None:
     def update_step(value):
         index = int(value)
         if 0 <= index < len(results_history):
-            mesh.point_data["Temperature"] = results_history[index]
+            mesh.point_data["Temperature"] = np.asarray(results_history[index])
 
     plotter.add_slider_widget(
         update_step,
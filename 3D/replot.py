@@ -0,0 +1,37 @@
+import argparse
+import os
+
+from results import RunResult, list_runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-plot stored runs from output/ without re-running them."
+    )
+    parser.add_argument(
+        "runs",
+        nargs="*",
+        help="Run base paths, e.g. output/ryzen_7 (default: every run in output/)",
+    )
+    parser.add_argument(
+        "--grid", action="store_true", help="Open the interactive 3D view as well"
+    )
+    args = parser.parse_args()
+
+    if args.runs:
+        runs = [RunResult(path) for path in args.runs]
+    else:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        runs = list_runs(os.path.join(script_dir, "output"))
+
+    if not runs:
+        print("No stored runs found.")
+
+    for run in runs:
+        max_temps = run.max_temperatures()
+        print(
+            f"{run.name}: {len(run.history)} steps, "
+            f"max {max_temps.max():.2f} C, final max {max_temps[-1]:.2f} C"
+        )
+        run.plot_max()
+        if args.grid:
+            run.plot_grid()
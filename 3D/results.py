@@ -0,0 +1,102 @@
+import glob
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from fem_types import Grid
+from history import HistoryReader, history_path
+
+
+def mesh_path(base_path: str) -> str:
+    return base_path + "_mesh.npz"
+
+
+def save_mesh(grid: Grid, base_path: str) -> None:
+    np.savez(
+        mesh_path(base_path),
+        coordinates=grid.coordinates,
+        connectivity=grid.connectivity,
+        convection_bc=grid.convection_bc,
+        dirichlet_bc=grid.dirichlet_bc,
+        k=grid.k,
+        rho=grid.rho,
+        cp=grid.cp,
+        Q=grid.Q,
+    )
+
+
+def load_mesh(base_path: str) -> Grid:
+    with np.load(mesh_path(base_path)) as data:
+        return Grid(**{name: data[name] for name in data.files})
+
+
+class RunResult:
+    """A finished run in output/, opened lazily from its stored files.
+
+    The temperature history is memory-mapped and per-step min/max come from
+    the stats file, so summaries and plots never load the full history.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.name = os.path.basename(base_path)
+        self._history = None
+
+    @property
+    def history(self) -> HistoryReader:
+        if self._history is None:
+            self._history = HistoryReader(self.base_path)
+        return self._history
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.history.times
+
+    def metadata(self) -> Dict[str, str]:
+        """Key/value pairs of the _result.txt summary."""
+        summary = {}
+        summary_path = self.base_path + "_result.txt"
+        if os.path.exists(summary_path):
+            with open(summary_path) as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    summary[key.strip()] = value.strip()
+        return summary
+
+    def max_temperatures(self) -> np.ndarray:
+        return self.history.max_temperatures()
+
+    def min_temperatures(self) -> np.ndarray:
+        return self.history.min_temperatures()
+
+    def grid(self) -> Grid:
+        return load_mesh(self.base_path)
+
+    def plot_max(self) -> None:
+        from plot_max import plot_max_temperature
+
+        source = self.metadata().get("Source Config", self.name)
+        plot_max_temperature(
+            self.base_path,
+            os.path.basename(source),
+            self.times.tolist(),
+            self.max_temperatures().tolist(),
+        )
+
+    def plot_grid(self) -> None:
+        from plot_grid import plot_grid
+
+        temperature_range = (
+            float(self.min_temperatures().min()),
+            float(self.max_temperatures().max()),
+        )
+        plot_grid(self.grid(), self.history, temperature_range)
+
+
+def list_runs(output_dir: str) -> List[RunResult]:
+    suffix = history_path("")
+    return [
+        RunResult(path[: -len(suffix)])
+        for path in sorted(glob.glob(os.path.join(output_dir, "*" + suffix)))
+    ]
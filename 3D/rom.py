@@ -0,0 +1,433 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import eigsh, splu
+
+from assembly import AssembledSystem
+from config import PLOT_SAVE_INTERVAL
+from config_loader import ConfigLoader, FullConfiguration
+from fem_types import GlobalData
+from history import HistoryReader, HistorySink, MaxTemperatureTracker
+from simulate import transient_system
+from solver import TransientSystem
+from system_cache import default_cache, load_or_assemble, system_cache_key
+
+ROM_METHODS = ("krylov", "pod")
+# Die power [W], ambient and water temperature [C] and the change of the
+# Dirichlet temperature over a step [C/s]
+ROM_INPUTS = ("power", "ambient_temp", "water_temp", "dirichlet_change")
+
+# Krylov expansion points in units of 1 / step_time: the steady state and
+# slow, medium and step-scale dynamics
+KRYLOV_SHIFTS = (0.0, 0.01, 0.1, 1.0)
+KRYLOV_MOMENTS = 4  # Moments matched per expansion point
+POD_TOLERANCE = 1e-10  # Discarded fraction of the snapshot energy
+
+# Die power [W] over simulated time [s]
+PowerTrace = Callable[[float], float]
+
+
+def constant_power(power: float) -> PowerTrace:
+    return lambda time: power
+
+
+def load_power_trace(path: str) -> PowerTrace:
+    """Power trace from a "time,power" CSV, linearly interpolated."""
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    return lambda time: float(np.interp(time, data[:, 0], data[:, 1]))
+
+
+def input_matrix(
+    system: TransientSystem, assembled: AssembledSystem, alpha: float
+) -> np.ndarray:
+    """(free DOFs, 4) load columns of the ROM_INPUTS.
+
+    assembled must hold the heat sources of 1 W of die power. The water
+    temperature enters through the Dirichlet lifting -H_fd @ 1. Backward Euler
+    also couples the free nodes to the previous Dirichlet values through
+    C_fd / dt, which matters on the first step, where those nodes jump from
+    the initial to the water temperature.
+    """
+    ones = np.ones(len(system.fixed))
+    return np.column_stack(
+        [
+            assembled.P_source[system.free],
+            alpha * assembled.P_convection[system.free],
+            -(system.H_free_rows[:, system.fixed] @ ones),
+            -(system.C_free_rows[:, system.fixed] @ ones),
+        ]
+    )
+
+
+def extend_basis(
+    basis: np.ndarray, vectors: np.ndarray, tolerance: float = 1e-10
+) -> np.ndarray:
+    """Orthonormal basis with the new directions of vectors appended."""
+    norms = np.linalg.norm(vectors, axis=0)
+    vectors = vectors[:, norms > 0] / norms[norms > 0]
+    # Gram-Schmidt twice keeps the basis orthonormal in floating point
+    for _ in range(2):
+        vectors = vectors - basis @ (basis.T @ vectors)
+    q, r = np.linalg.qr(vectors)
+    return np.hstack([basis, q[:, np.abs(np.diag(r)) > tolerance]])
+
+
+def uniform_basis(size: int) -> np.ndarray:
+    # Uniform temperatures (the initial state) are represented exactly
+    return np.full((size, 1), 1.0 / np.sqrt(size))
+
+
+def krylov_basis(
+    system: TransientSystem,
+    inputs: np.ndarray,
+    dt: float,
+    shifts: tuple = KRYLOV_SHIFTS,
+    moments: int = KRYLOV_MOMENTS,
+) -> np.ndarray:
+    """Moment-matching basis: (H + sC)^-1 (C (H + sC)^-1)^j B at every shift s.
+
+    The reduced transfer function from the inputs to the temperatures then
+    matches the full one in its first moments around each expansion point.
+    """
+    basis = uniform_basis(len(system.free))
+    for shift in shifts:
+        lu = splu((system.H_ff + shift / dt * system.C_ff).tocsc())
+        block = lu.solve(inputs)
+        for _ in range(moments):
+            size = basis.shape[1]
+            basis = extend_basis(basis, block)
+            if basis.shape[1] == size:
+                break
+            block = lu.solve(system.C_ff @ basis[:, size:])
+    return basis
+
+
+def pod_basis(system: TransientSystem, history: HistoryReader) -> np.ndarray:
+    """Proper orthogonal decomposition of a stored temperature history."""
+    num_nodes = len(system.free) + len(system.fixed)
+    if history.num_nodes != num_nodes:
+        raise ValueError(
+            f"History has {history.num_nodes} nodes, the mesh has {num_nodes}"
+        )
+
+    basis = uniform_basis(len(system.free))
+    snapshots = np.array(history.temperatures[:, system.free]).T
+    snapshots -= basis @ (basis.T @ snapshots)
+    modes, singular_values, _ = np.linalg.svd(snapshots, full_matrices=False)
+    energy = np.cumsum(singular_values**2)
+    if energy[-1] == 0:
+        return basis
+    rank = int(np.searchsorted(energy / energy[-1], 1 - POD_TOLERANCE)) + 1
+    return extend_basis(basis, modes[:, :rank])
+
+
+class ReducedModel:
+    """Galerkin projection of the free-DOF Backward Euler system onto a basis.
+
+    With T_free = V a for an orthonormal basis V, a step solves the small dense
+    system (Hr + Cr / dt) a_n = Br u_n + Cr a_{n-1} / dt, where Hr = V^T H_ff V,
+    Cr = V^T C_ff V and u holds the ROM_INPUTS. The reduced matrices stay
+    symmetric positive definite, so steps are as stable as the full ones.
+
+    Each step also bounds the error it adds. The full residual r = M z of
+    z = (a_n, u_n, a_{n-1}) has the norm of R z for the QR factor R of M, and
+    max |T - V a| <= dt / lambda_min(C_ff) * sum |r| against the Backward
+    Euler steps of simulate() from the same initial state (Dirichlet nodes
+    are exact). The bound holds for any power trace but is far from tight;
+    compare_with_full() measures the error.
+    """
+
+    def __init__(
+        self,
+        system: TransientSystem,
+        assembled: AssembledSystem,
+        inputs: np.ndarray,
+        basis: np.ndarray,
+        min_mass_eigenvalue: float = None,
+    ):
+        self.system = system
+        self.assembled = assembled
+        self.inputs = inputs
+        self.basis = basis
+        self.HV = system.H_ff @ basis
+        self.CV = system.C_ff @ basis
+        self.H = basis.T @ self.HV
+        self.C = basis.T @ self.CV
+        self.B = basis.T @ inputs
+        if min_mass_eigenvalue is None:
+            min_mass_eigenvalue = eigsh(
+                system.C_ff, k=1, sigma=0, which="LM", return_eigenvectors=False
+            )[0]
+        self.min_mass_eigenvalue = float(min_mass_eigenvalue)
+        self._steppers: dict[float, tuple] = {}
+
+    @property
+    def size(self) -> int:
+        return self.basis.shape[1]
+
+    def stepper(self, dt: float) -> tuple:
+        """LU factors of the reduced left-hand side and the residual's R factor."""
+        if dt not in self._steppers:
+            residual = np.hstack([self.HV + self.CV / dt, -self.inputs, -self.CV / dt])
+            self._steppers[dt] = (
+                lu_factor(self.H + self.C / dt),
+                np.linalg.qr(residual, mode="r"),
+            )
+        return self._steppers[dt]
+
+    def reduce(self, temperatures: np.ndarray) -> np.ndarray:
+        return self.basis.T @ temperatures[self.system.free]
+
+    def expand(self, state: np.ndarray, dirichlet_temp: float) -> np.ndarray:
+        temperatures = np.empty(self.system.H_free_rows.shape[1])
+        temperatures[self.system.free] = self.basis @ state
+        temperatures[self.system.fixed] = dirichlet_temp
+        return temperatures
+
+
+def dirichlet_temperature(global_data: GlobalData, time: float) -> float:
+    """Like simulate(), Dirichlet nodes start at InitialTemp and then hold WaterTemp."""
+    return global_data.InitialTemp if time == 0 else global_data.WaterTemp
+
+
+def step_inputs(
+    global_data: GlobalData, power_trace: PowerTrace, time: float, dt: float
+) -> np.ndarray:
+    """ROM_INPUTS of the step that ends at time."""
+    dirichlet_change = (
+        global_data.WaterTemp - dirichlet_temperature(global_data, time - dt)
+    ) / dt
+    return np.array(
+        [power_trace(time), global_data.Tenv, global_data.WaterTemp, dirichlet_change]
+    )
+
+
+def reduced_steps(
+    model: ReducedModel, global_data: GlobalData, power_trace: PowerTrace
+) -> Iterator[tuple[float, np.ndarray, float]]:
+    """Yields (time, reduced state, error bound) for the initial state and every step."""
+    dt = global_data.SimulationStepTime
+    lu, residual = model.stepper(dt)
+    num_nodes = model.system.H_free_rows.shape[1]
+    state = model.reduce(np.full(num_nodes, global_data.InitialTemp))
+    error_bound = 0.0
+    yield 0.0, state, error_bound
+
+    current_time = 0.0
+    while current_time < global_data.SimulationTime:
+        current_time += dt
+        u = step_inputs(global_data, power_trace, current_time, dt)
+        previous = state
+        state = lu_solve(lu, model.B @ u + model.C @ state / dt)
+        residual_norm = np.linalg.norm(residual @ np.concatenate([state, u, previous]))
+        error_bound += dt / model.min_mass_eigenvalue * residual_norm
+        yield current_time, state, error_bound
+
+
+def full_steps(
+    model: ReducedModel, global_data: GlobalData, power_trace: PowerTrace
+) -> Iterator[tuple[float, np.ndarray]]:
+    """Yields (time, temperatures) of the full model for the same trace.
+
+    Steps go through TransientSystem.step from the initial state of
+    simulate(), independently of the reduced model's input matrix.
+    """
+    system = model.system
+    assembled = model.assembled
+    dt = global_data.SimulationStepTime
+    temperatures = np.full(system.state_shape, global_data.InitialTemp)
+    yield 0.0, temperatures
+
+    convection = global_data.Alpha * global_data.Tenv * assembled.P_convection
+    current_time = 0.0
+    while current_time < global_data.SimulationTime:
+        current_time += dt
+        global_P = power_trace(current_time) * assembled.P_source + convection
+        loads = system.with_loads(global_P, global_data.WaterTemp)
+        temperatures = loads.step(temperatures, dt)
+        yield current_time, temperatures
+
+
+def simulate_reduced(
+    model: ReducedModel,
+    global_data: GlobalData,
+    power_trace: PowerTrace,
+    sink: HistorySink,
+) -> float:
+    """Runs the reduced transient and returns the error bound of the last step.
+
+    Temperatures are only expanded to the full mesh for the saved steps.
+    """
+    last_plot_time = -PLOT_SAVE_INTERVAL
+    error_bound = 0.0
+    for current_time, state, error_bound in reduced_steps(
+        model, global_data, power_trace
+    ):
+        if current_time - last_plot_time >= PLOT_SAVE_INTERVAL:
+            sink.write(
+                current_time,
+                model.expand(state, dirichlet_temperature(global_data, current_time)),
+            )
+            last_plot_time = current_time
+    return error_bound
+
+
+@dataclass
+class RomComparison:
+    max_error: float  # Max |T_full - T_reduced| over all nodes and steps [C]
+    error_bound: float  # Bound on max_error [C]
+    reduced_time: float  # [s]
+    full_time: float  # [s]
+
+    @property
+    def speedup(self) -> float:
+        return self.full_time / self.reduced_time
+
+
+def compare_with_full(
+    model: ReducedModel, global_data: GlobalData, power_trace: PowerTrace
+) -> RomComparison:
+    """Runs the reduced and the full transient and measures the actual error."""
+    start_time = time.perf_counter()
+    reduced = list(reduced_steps(model, global_data, power_trace))
+    reduced_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    full = list(full_steps(model, global_data, power_trace))
+    full_time = time.perf_counter() - start_time
+
+    max_error = max(
+        np.max(
+            np.abs(
+                model.expand(state, dirichlet_temperature(global_data, current_time))
+                - temperatures
+            )
+        )
+        for (current_time, state, _), (_, temperatures) in zip(reduced, full)
+    )
+    return RomComparison(max_error, reduced[-1][2], reduced_time, full_time)
+
+
+def rom_key(cfg: FullConfiguration, method: str, history: str = None) -> str:
+    """Hash of everything the basis depends on; power enters as an input."""
+    data = {
+        "mesh": system_cache_key(cfg.mesh_generator(power=1.0)),
+        "alpha": cfg.simulation.alpha,
+        "step_time": cfg.simulation.step_time,
+        "method": method,
+        "inputs": ROM_INPUTS,
+    }
+    if method == "pod":
+        data["history"] = os.path.abspath(history)
+        data["history_mtime"] = os.path.getmtime(history + "_temperature_history.npy")
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def load_or_build_reduced_model(
+    cfg: FullConfiguration, path: str, method: str = "krylov", history: str = None
+) -> ReducedModel:
+    """The reduced model of cfg, with its basis stored at path.
+
+    The basis is rebuilt when the stored one was made for another mesh,
+    alpha, step or method. POD uses the stored history at base path history.
+    """
+    if method not in ROM_METHODS:
+        raise ValueError(
+            f"Unknown ROM method '{method}'. Options: {', '.join(ROM_METHODS)}"
+        )
+    if method == "pod" and history is None:
+        raise ValueError("The 'pod' method needs a stored temperature history")
+
+    grid, assembled = load_or_assemble(cfg.mesh_generator(power=1.0), default_cache())
+    global_data = cfg.global_data()
+    system = transient_system(grid, global_data, cfg.simulation.solver, assembled)
+    inputs = input_matrix(system, assembled, global_data.Alpha)
+
+    key = rom_key(cfg, method, history)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if str(data["key"]) == key:
+                return ReducedModel(
+                    system,
+                    assembled,
+                    inputs,
+                    data["basis"],
+                    data["min_mass_eigenvalue"],
+                )
+
+    print(f"--- BUILDING {method.upper()} BASIS ---")
+    if method == "krylov":
+        basis = krylov_basis(system, inputs, global_data.SimulationStepTime)
+    else:
+        basis = pod_basis(system, HistoryReader(history))
+    model = ReducedModel(system, assembled, inputs, basis)
+    np.savez(
+        path,
+        key=key,
+        basis=model.basis,
+        min_mass_eigenvalue=model.min_mass_eigenvalue,
+    )
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fast transient reruns on a reduced-order model."
+    )
+    parser.add_argument("config_file", help="e.g. simulations/ryzen_7.toml")
+    parser.add_argument("--method", choices=ROM_METHODS, default="krylov")
+    parser.add_argument(
+        "--history",
+        help="POD snapshots: base path of a stored history (default: output/<config>)",
+    )
+    parser.add_argument(
+        "--power-trace", help='"time,power" CSV (default: the configured power)'
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="Also run the full model"
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the basis")
+    args = parser.parse_args()
+
+    cfg = ConfigLoader.load_from_file(args.config_file)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(os.path.join(script_dir, "output"), exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(args.config_file))[0]
+    base_path = os.path.join(script_dir, "output", base_name)
+    rom_path = f"{base_path}_{args.method}_rom.npz"
+    if args.rebuild and os.path.exists(rom_path):
+        os.remove(rom_path)
+
+    start_time = time.time()
+    model = load_or_build_reduced_model(
+        cfg, rom_path, args.method, args.history or base_path
+    )
+    print(f"Reduced model: {model.size} DOFs ({time.time() - start_time:.2f} s)")
+
+    if args.power_trace:
+        power_trace = load_power_trace(args.power_trace)
+    else:
+        power_trace = constant_power(cfg.power)
+    global_data = cfg.global_data()
+
+    tracker = MaxTemperatureTracker()
+    start_time = time.time()
+    error_bound = simulate_reduced(model, global_data, power_trace, tracker)
+    print(f"Max Temp Reached: {tracker.max_temps[-1]:.2f} C")
+    print(f"Error Bound: {error_bound:.3e} C")
+    print(f"Compute Time: {time.time() - start_time:.3f} s")
+
+    if args.compare:
+        comparison = compare_with_full(model, global_data, power_trace)
+        print(f"Max Error vs. Full Model: {comparison.max_error:.3e} C")
+        print(
+            f"Full: {comparison.full_time:.3f} s, reduced: "
+            f"{comparison.reduced_time:.4f} s ({comparison.speedup:.0f}x)"
+        )
@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from assembly import AssembledSystem, assemble_system
+from fem_types import Grid, GlobalData
+from history import HistorySink, InMemoryHistory
+from simulate import simulate, transient_system
+from solver import SolverSettings, TransientSystem
+from time_stepping import TimeSteppingSettings
+
+
+@dataclass
+class Scenario:
+    """Loads of one scenario; None keeps the value of the global data."""
+
+    name: str
+    power_scale: float = 1.0  # Multiplies every heat source of the grid
+    ambient_temp: float = None  # Tenv [C]
+    water_temp: float = None  # Dirichlet BC [C]
+    initial_temp: float = None  # [C]
+
+
+class ScenarioSinks(HistorySink):
+    """Writes column i of a (nodes, scenarios) block to the i-th sink."""
+
+    def __init__(self, sinks: List[HistorySink]):
+        self.sinks = sinks
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        for i, sink in enumerate(self.sinks):
+            sink.write(time, temperatures[:, i])
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def scenario_loads(
+    assembled: AssembledSystem, global_data: GlobalData, scenarios: List[Scenario]
+) -> tuple[np.ndarray, np.ndarray]:
+    """The (nodes, scenarios) load block and the water temperature per column."""
+    num_nodes = len(assembled.P_source)
+    global_P = np.empty((num_nodes, len(scenarios)))
+    water_temps = np.empty(len(scenarios))
+    for i, scenario in enumerate(scenarios):
+        t_env = (
+            global_data.Tenv if scenario.ambient_temp is None else scenario.ambient_temp
+        )
+        global_P[:, i] = scenario.power_scale * assembled.P_source
+        global_P[:, i] += global_data.Alpha * t_env * assembled.P_convection
+        water_temps[i] = (
+            global_data.WaterTemp
+            if scenario.water_temp is None
+            else scenario.water_temp
+        )
+    return global_P, water_temps
+
+
+def scenario_initial_temperatures(
+    num_nodes: int, global_data: GlobalData, scenarios: List[Scenario]
+) -> np.ndarray:
+    """(nodes, scenarios) block of uniform initial temperatures."""
+    initial_temps = [
+        global_data.InitialTemp if s.initial_temp is None else s.initial_temp
+        for s in scenarios
+    ]
+    return np.tile(np.array(initial_temps, dtype=float), (num_nodes, 1))
+
+
+def simulate_scenarios(
+    grid: Grid,
+    global_data: GlobalData,
+    scenarios: List[Scenario],
+    solver_settings: SolverSettings = None,
+    sinks: List[HistorySink] = None,
+    assembled: AssembledSystem = None,
+    system: TransientSystem = None,
+    time_stepping: TimeSteppingSettings = None,
+    mode: str = "transient",
+) -> List[List[np.ndarray]] | None:
+    """Runs scenarios that only differ in power and ambient, water and initial
+    temperature.
+
+    The left-hand side is the same for all of them, so they are advanced
+    together: each step is a single solve with one right-hand side column per
+    scenario, reusing one factorization. A ready TransientSystem for the grid
+    and global data also reuses its factorizations. Adaptive steps are chosen
+    for the worst scenario, and a steady_tolerance stops once all scenarios
+    have settled.
+
+    Saved steps of scenario i go to sinks[i] when sinks are given; otherwise
+    each scenario's steps are collected and returned.
+    """
+    if assembled is None:
+        print("--- STARTING ASSEMBLY OF MATRICES (This may take a moment...) ---")
+        assembled = assemble_system(grid)
+        print("--- END OF ASSEMBLY ---")
+    if system is None:
+        system = transient_system(grid, global_data, solver_settings, assembled)
+
+    print(f"--- {len(scenarios)} SCENARIOS SHARING ONE SYSTEM ---")
+    global_P, water_temps = scenario_loads(assembled, global_data, scenarios)
+    histories = [InMemoryHistory() for _ in scenarios] if sinks is None else sinks
+    simulate(
+        grid,
+        global_data,
+        solver_settings,
+        sink=ScenarioSinks(histories),
+        system=system.with_loads(global_P, water_temps),
+        time_stepping=time_stepping,
+        mode=mode,
+        initial_temperatures=scenario_initial_temperatures(
+            grid.num_nodes, global_data, scenarios
+        ),
+    )
+    return [history.steps for history in histories] if sinks is None else None
@@ -0,0 +1,96 @@
+import functools
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import Callable, Iterator, List
+
+from threadpoolctl import threadpool_limits
+
+from concurrency import limit_threads
+from config_loader import ConfigLoader, FullConfiguration
+from mesh_generator.mesh_generator import PastePattern
+from shared_system import SharedSpec
+
+
+@dataclass
+class SimulationTask:
+    config_file: str
+    paste_pattern: PastePattern | None = None
+    shared_base: SharedSpec | None = None
+    cost: float = 0.0  # Estimated work, nodes x time steps
+
+    @property
+    def label(self) -> str:
+        name = os.path.basename(self.config_file)
+        if self.paste_pattern is not None:
+            name += f" [{self.paste_pattern.name}]"
+        return name
+
+
+def estimate_cost(cfg: FullConfiguration) -> float:
+    nodes = cfg.mesh_generator().num_nodes
+    steps = max(1.0, cfg.simulation.sim_time / cfg.simulation.step_time)
+    return nodes * steps
+
+
+def build_tasks(
+    config_files: List[str], run_all_patterns: bool
+) -> List[SimulationTask]:
+    """Expands config files (x paste patterns) into tasks, most expensive first.
+
+    Starting the largest tasks first keeps a long task from being left for the
+    end while the other workers idle. Configs that fail to load get zero cost;
+    the task itself reports the error.
+    """
+    tasks = []
+    for config_file in config_files:
+        try:
+            cost = estimate_cost(ConfigLoader.load_from_file(config_file))
+        except Exception:
+            cost = 0.0
+        patterns = list(PastePattern) if run_all_patterns else [None]
+        for pattern in patterns:
+            tasks.append(SimulationTask(config_file, pattern, cost=cost))
+    return sorted(tasks, key=lambda task: task.cost, reverse=True)
+
+
+def _run_safely(
+    function: Callable[[SimulationTask], str], task: SimulationTask
+) -> tuple[SimulationTask, str]:
+    try:
+        return task, function(task)
+    except Exception as e:
+        return (
+            task,
+            f"[{multiprocessing.current_process().name}] ERROR {task.label}: {e}",
+        )
+
+
+def run_tasks(
+    function: Callable[[SimulationTask], str],
+    tasks: List[SimulationTask],
+    num_workers: int,
+    chunksize: int = 1,
+    threads_per_process: int = 1,
+) -> Iterator[tuple[SimulationTask, str]]:
+    """Runs function over tasks on a process pool, yielding results as they finish.
+
+    Exceptions raised by a task are turned into an ERROR result instead of
+    stopping the batch. Every worker caps its BLAS/OpenMP threads at startup.
+    With one worker the tasks run in this process. Tasks are handed out one
+    at a time by default: they arrive sorted by cost, so larger chunks would
+    put consecutive heavy tasks on the same worker.
+    """
+    run = functools.partial(_run_safely, function)
+    if num_workers <= 1:
+        # Lifted again afterwards, so the cap does not outlive the batch
+        with threadpool_limits(limits=threads_per_process):
+            yield from map(run, tasks)
+        return
+
+    with multiprocessing.Pool(
+        processes=num_workers,
+        initializer=limit_threads,
+        initargs=(threads_per_process,),
+    ) as pool:
+        yield from pool.imap_unordered(run, tasks, chunksize=chunksize)
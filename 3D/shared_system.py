@@ -0,0 +1,174 @@
+import dataclasses
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from assembly import (
+    AssembledSystem,
+    SparsityPattern,
+    assemble_system,
+    calculate_grid_element_matrices,
+)
+from fem_types import Grid
+from mesh_generator.mesh_generator import MeshGenerator, PastePattern
+
+# name -> (shared memory block name, shape, dtype)
+SharedSpec = Dict[str, Tuple[str, tuple, str]]
+
+GRID_FIELDS = [field.name for field in dataclasses.fields(Grid)]
+MATRIX_NAMES = ("H_conduction", "H_convection", "C")
+VECTOR_NAMES = ("P_source", "P_convection")
+
+_attached: Dict[tuple, "SharedArrays"] = {}
+
+
+class SharedArrays:
+    """Named NumPy arrays backed by multiprocessing.shared_memory blocks.
+
+    The creating process owns the blocks and must unlink() them; other
+    processes attach() through the picklable spec and get zero-copy, read-only
+    views.
+    """
+
+    def __init__(self, blocks: Dict[str, SharedMemory], spec: SharedSpec):
+        self._blocks = blocks
+        self.spec = spec
+        self.arrays = {}
+        for name, (_, shape, dtype) in spec.items():
+            self.arrays[name] = np.ndarray(shape, dtype, buffer=blocks[name].buf)
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray]) -> "SharedArrays":
+        blocks = {}
+        spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            # Zero-sized blocks are not allowed
+            block = SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            blocks[name] = block
+            spec[name] = (block.name, array.shape, array.dtype.str)
+        return cls(blocks, spec)
+
+    @classmethod
+    def attach(cls, spec: SharedSpec) -> "SharedArrays":
+        """Attaches once per process; views stay valid for the process lifetime."""
+        key = tuple(sorted(block_name for block_name, _, _ in spec.values()))
+        if key not in _attached:
+            blocks = {
+                name: _open_untracked(block_name)
+                for name, (block_name, _, _) in spec.items()
+            }
+            shared = cls(blocks, spec)
+            for array in shared.arrays.values():
+                array.flags.writeable = False
+            _attached[key] = shared
+        return _attached[key]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def unlink(self) -> None:
+        self.arrays.clear()
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+
+
+def _open_untracked(block_name: str) -> SharedMemory:
+    """Opens an existing block without registering it with the resource tracker.
+
+    A registered block may be unlinked (or reported as leaked) by the tracker
+    when this process exits, while the creating process still owns it.
+    Unregistering after the fact is no better: pool workers share the
+    tracker of their parent, so that would drop the owner's registration.
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=block_name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name=block_name)
+    finally:
+        resource_tracker.register = register
+
+
+def share_pattern_base(generator: MeshGenerator) -> SharedArrays:
+    """Puts the pattern-independent part of a mesh into shared memory.
+
+    The grid is assembled with the paste layer left out (zero material), and
+    the CSR data slots of the paste layer elements are stored alongside, so a
+    worker only integrates and adds the paste layer for its own pattern.
+    """
+    grid = generator.generate_grid()
+    paste_elements = generator.paste_layer_elements()
+    grid.k[paste_elements] = 0.0
+    grid.rho[paste_elements] = 0.0
+    grid.cp[paste_elements] = 0.0
+    grid.Q[paste_elements] = 0.0
+
+    pattern = SparsityPattern(grid.connectivity, grid.num_nodes)
+    system = assemble_system(grid, pattern)
+
+    arrays = {name: getattr(grid, name) for name in GRID_FIELDS}
+    arrays["indices"] = system.H_conduction.indices
+    arrays["indptr"] = system.H_conduction.indptr
+    for name in MATRIX_NAMES:
+        arrays[name] = getattr(system, name).data
+    for name in VECTOR_NAMES:
+        arrays[name] = getattr(system, name)
+    arrays["paste_elements"] = paste_elements
+    arrays["paste_slots"] = pattern.scatter_map[paste_elements]
+    return SharedArrays.create(arrays)
+
+
+def pattern_system(
+    shared: SharedArrays, generator: MeshGenerator, pattern: PastePattern
+) -> tuple[Grid, AssembledSystem]:
+    """Grid and assembled system for one paste pattern on a shared base.
+
+    Geometry, boundary masks and the convection terms stay shared; only the
+    material arrays and the conduction/capacity data that the paste layer
+    adds to are copied.
+    """
+    paste_elements = shared["paste_elements"]
+    grid = Grid(
+        coordinates=shared["coordinates"],
+        connectivity=shared["connectivity"],
+        convection_bc=shared["convection_bc"],
+        dirichlet_bc=shared["dirichlet_bc"],
+        k=shared["k"].copy(),
+        rho=shared["rho"].copy(),
+        cp=shared["cp"].copy(),
+        Q=shared["Q"],
+    )
+    k, rho, cp = generator.paste_layer_materials(pattern)
+    grid.k[paste_elements] = k
+    grid.rho[paste_elements] = rho
+    grid.cp[paste_elements] = cp
+
+    shape = (grid.num_nodes, grid.num_nodes)
+    indices, indptr = shared["indices"], shared["indptr"]
+    system = AssembledSystem(
+        H_conduction=csr_matrix(
+            (shared["H_conduction"].copy(), indices, indptr), shape=shape
+        ),
+        H_convection=csr_matrix((shared["H_convection"], indices, indptr), shape=shape),
+        C=csr_matrix((shared["C"].copy(), indices, indptr), shape=shape),
+        P_source=shared["P_source"].copy(),
+        P_convection=shared["P_convection"],
+    )
+
+    H_local, C_local, P_local = calculate_grid_element_matrices(grid, paste_elements)
+    system.add_element_matrices(
+        shared["paste_slots"],
+        grid.connectivity[paste_elements],
+        H_local,
+        C_local,
+        P_local,
+    )
+    return grid, system
@@ -1,105 +1,153 @@
-from typing import List
-from config import DEBUG, SAVE_TO_CSV, PLOT_SAVE_INTERVAL
-from jacobian import UniversalJacobian, calculate_jacobian_for_finite_element
-from element_matrices import (
-    transform_local_derivatives_to_global,
-    calculate_element_matrices,
-)
-from boundary_matrices import generate_Hbc_matrix_and_P_vector
+from typing import Iterator, List
+from config import DEBUG, PLOT_SAVE_INTERVAL
+from assembly import AssembledSystem, assemble_system
 from fem_types import Grid, GlobalData
+from history import HistorySink, InMemoryHistory
+from solver import SolverSettings, TransientSystem
+from time_stepping import TimeSteppingSettings, adaptive_steps, fixed_steps
 
 import numpy as np
-import pandas as pd
-from scipy.sparse import lil_matrix, csr_matrix
-from scipy.sparse.linalg import spsolve
-from tqdm import tqdm
 
 
-def simulate(grid: Grid, global_data: GlobalData) -> List[np.ndarray]:
-    uj = UniversalJacobian()
-    t0 = np.array([global_data.InitialTemp for _ in grid.nodes])
-    current_time = 0
-
-    print(f"Nodes: {len(grid.nodes)}")
-    print("--- STARTING ASSEMBLY OF MATRICES (This may take a moment...) ---")
-
-    global_H = lil_matrix((len(grid.nodes), len(grid.nodes)))
-    global_C = lil_matrix((len(grid.nodes), len(grid.nodes)))
-    global_P = np.zeros(len(grid.nodes))
-
-    for i, element in tqdm(enumerate(grid.elements), total=len(grid.elements)):
-        element.jacobian = calculate_jacobian_for_finite_element(element, grid, uj)
-        dN_d_x, dN_d_y, dN_d_z = transform_local_derivatives_to_global(
-            uj.dN_d_xi, uj.dN_d_eta, uj.dN_d_zeta, element.jacobian
-        )
-
-        H_local, C_local, P_source_local = calculate_element_matrices(
-            dN_d_x,
-            dN_d_y,
-            dN_d_z,
-            uj.N_functions,
-            element.jacobian,
-            global_data,
-            element,
-        )
-
-        Hbc_local, P_bc_local = generate_Hbc_matrix_and_P_vector(
-            element, global_data, grid
-        )
-        H_local += Hbc_local
-
-        for i_loc, node_id_i in enumerate(element.node_ids):
-            idx_i = node_id_i - 1
-            global_P[idx_i] += P_source_local[i_loc] + P_bc_local[i_loc]
-
-            for j_loc, node_id_j in enumerate(element.node_ids):
-                idx_j = node_id_j - 1
-
-                global_H[idx_i, idx_j] += H_local[i_loc, j_loc]
-                global_C[idx_i, idx_j] += C_local[i_loc, j_loc]
-
-    print("--- END OF ASSEMBLY. CONVERTING TO CSR... ---")
-    global_H = global_H.tocsr()
-    global_C = global_C.tocsr()
-
+def transient_system(
+    grid: Grid,
+    global_data: GlobalData,
+    solver_settings: SolverSettings = None,
+    assembled: AssembledSystem = None,
+) -> TransientSystem:
+    """Backward Euler system of the grid, assembling it unless assembled is given."""
+    print(f"Nodes: {grid.num_nodes}")
+    if assembled is None:
+        print("--- STARTING ASSEMBLY OF MATRICES (This may take a moment...) ---")
+        assembled = assemble_system(grid)
+        print("--- END OF ASSEMBLY ---")
+    else:
+        print("--- USING PRE-ASSEMBLED MATRICES ---")
+
+    global_H, global_C, global_P = assembled.matrices(global_data)
+    return TransientSystem(
+        global_H,
+        global_C,
+        global_P,
+        np.flatnonzero(grid.dirichlet_bc),
+        global_data.WaterTemp,
+        solver_settings,
+    )
+
+
+def simulate_steps(
+    grid: Grid,
+    global_data: GlobalData,
+    solver_settings: SolverSettings = None,
+    assembled: AssembledSystem = None,
+    system: TransientSystem = None,
+    time_stepping: TimeSteppingSettings = None,
+    initial_temperatures: np.ndarray = None,
+) -> Iterator[tuple[float, np.ndarray]]:
+    """Yields (time, temperatures) for the initial state and every saved step.
+
+    A pre-assembled system for the grid (e.g. from the system cache) skips the
+    assembly; a ready TransientSystem also reuses its factorizations. Steps
+    have a fixed SimulationStepTime unless time_stepping selects adaptive mode.
+    With a steady_tolerance the run stops once no node changes by more than
+    that within a step; the final state is always yielded. The initial state
+    is InitialTemp everywhere unless initial_temperatures is given.
+    """
+    if system is None:
+        system = transient_system(grid, global_data, solver_settings, assembled)
+
+    if initial_temperatures is None:
+        t0 = np.full(system.state_shape, global_data.InitialTemp, dtype=float)
+    else:
+        t0 = np.array(initial_temperatures, dtype=float)
     dt = global_data.SimulationStepTime
-    lhs_matrix = global_H + (global_C / dt)
-
-    dirichlet_indices = [i for i, node in enumerate(grid.nodes) if node.dirichlet_bc]
-    lhs_matrix = lhs_matrix.tolil()
-
-    for idx in dirichlet_indices:
-        lhs_matrix[idx, :] = 0
-        lhs_matrix[idx, idx] = 1.0
-    lhs_matrix = lhs_matrix.tocsr()
-
-    if SAVE_TO_CSV:
-        results_history = {}
-        results_history["Time_0.0"] = t0.copy()
-        summary_stats = []
 
     print("--- STARTING TIME SIMULATION ---")
     plot_update_interval = PLOT_SAVE_INTERVAL
     last_plot_time = -plot_update_interval
 
-    simulation_history = [t0.copy()]
-
-    while current_time < global_data.SimulationTime:
-        rhs_vector = global_P + (global_C.dot(t0) / dt)
-        for idx in dirichlet_indices:
-            rhs_vector[idx] = global_data.WaterTemp
+    yield 0.0, t0
 
-        t0 = spsolve(lhs_matrix, rhs_vector)
+    if time_stepping is not None and time_stepping.mode == "adaptive":
+        steps = adaptive_steps(
+            system, t0, global_data.SimulationTime, dt, time_stepping
+        )
+    else:
+        steps = fixed_steps(system, t0, global_data.SimulationTime, dt)
 
-        current_time += dt
+    steady_tolerance = time_stepping.steady_tolerance if time_stepping else 0.0
+    t_prev = t0
+    for current_time, t0 in steps:
         min_t = np.min(t0)
         max_t = np.max(t0)
+        converged = (
+            steady_tolerance > 0 and np.max(np.abs(t0 - t_prev)) < steady_tolerance
+        )
+        t_prev = t0
 
-        if current_time - last_plot_time >= plot_update_interval:
-            simulation_history.append(t0.copy())
+        if current_time - last_plot_time >= plot_update_interval or converged:
+            yield current_time, t0
             last_plot_time = current_time
 
         if DEBUG or True:
             print(f"Time: {current_time:.2f}s | Min: {min_t:.2f} | Max: {max_t:.2f}")
 
-    return simulation_history
+        if converged:
+            print(f"--- STEADY STATE REACHED AT {current_time:.2f}s ---")
+            break
+
+
+def simulate_steady(
+    grid: Grid,
+    global_data: GlobalData,
+    solver_settings: SolverSettings = None,
+    assembled: AssembledSystem = None,
+    system: TransientSystem = None,
+) -> np.ndarray:
+    """Solves the steady-state problem H T = P directly."""
+    if system is None:
+        system = transient_system(grid, global_data, solver_settings, assembled)
+
+    print("--- SOLVING STEADY STATE ---")
+    temperatures = system.steady_state()
+    print(
+        f"Steady state | Min: {np.min(temperatures):.2f} | Max: {np.max(temperatures):.2f}"
+    )
+    return temperatures
+
+
+def simulate(
+    grid: Grid,
+    global_data: GlobalData,
+    solver_settings: SolverSettings = None,
+    sink: HistorySink = None,
+    assembled: AssembledSystem = None,
+    system: TransientSystem = None,
+    time_stepping: TimeSteppingSettings = None,
+    mode: str = "transient",
+    initial_temperatures: np.ndarray = None,
+) -> List[np.ndarray] | None:
+    """Runs the transient simulation, or the steady-state solve for "steady".
+
+    Saved steps are streamed to sink when one is given; otherwise they are
+    collected and returned as a list. The steady state is a single step at
+    time 0.
+    """
+    history = InMemoryHistory() if sink is None else sink
+    if mode == "steady":
+        history.write(
+            0.0, simulate_steady(grid, global_data, solver_settings, assembled, system)
+        )
+        return history.steps if sink is None else None
+
+    for time, temperatures in simulate_steps(
+        grid,
+        global_data,
+        solver_settings,
+        assembled,
+        system,
+        time_stepping,
+        initial_temperatures,
+    ):
+        history.write(time, temperatures)
+    return history.steps if sink is None else None
@@ -0,0 +1,221 @@
+import copy
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import LinearOperator, bicgstab, cg, spilu, splu
+
+SOLVERS = ("direct", "cg")
+PRECONDITIONERS = ("none", "jacobi", "ilu", "amg")
+
+
+@dataclass
+class SolverSettings:
+    solver: str = "direct"
+    preconditioner: str = "jacobi"
+    tolerance: float = 1e-8  # Relative residual for iterative solvers
+    max_iterations: int = 1000
+
+
+class DirectSolver:
+    """Sparse LU (SuperLU) factorization reused for every right-hand side.
+
+    A 2D right-hand side is solved column by column in one call.
+    """
+
+    def __init__(self, matrix: csr_matrix):
+        self._lu = splu(matrix.tocsc())
+
+    def solve(self, rhs: np.ndarray, x0: np.ndarray = None) -> np.ndarray:
+        return self._lu.solve(rhs)
+
+
+class IterativeSolver:
+    """Preconditioned Krylov solver, warm-started from the previous solution.
+
+    Avoids the fill-in of a direct factorization on large meshes; the
+    preconditioner is built once per matrix. SuperLU's incomplete LU is not
+    symmetric, so the ILU preconditioner is paired with BiCGSTAB instead of CG.
+    """
+
+    def __init__(self, matrix: csr_matrix, settings: SolverSettings):
+        self.matrix = matrix.tocsr()
+        self.settings = settings
+        self.preconditioner = build_preconditioner(self.matrix, settings.preconditioner)
+        self.method = bicgstab if settings.preconditioner == "ilu" else cg
+        self.last_iterations = 0
+
+    def solve(self, rhs: np.ndarray, x0: np.ndarray = None) -> np.ndarray:
+        if rhs.ndim == 2:
+            # Krylov methods take one right-hand side at a time
+            return np.column_stack(
+                [
+                    self.solve(rhs[:, i], None if x0 is None else x0[:, i])
+                    for i in range(rhs.shape[1])
+                ]
+            )
+
+        iterations = 0
+
+        def count_iteration(_):
+            nonlocal iterations
+            iterations += 1
+
+        solution, info = self.method(
+            self.matrix,
+            rhs,
+            x0=x0,
+            rtol=self.settings.tolerance,
+            maxiter=self.settings.max_iterations,
+            M=self.preconditioner,
+            callback=count_iteration,
+        )
+        self.last_iterations = iterations
+        if info > 0:
+            print(
+                f"Warning: {self.method.__name__} did not converge in {info} iterations "
+                f"(preconditioner: {self.settings.preconditioner})"
+            )
+        elif info < 0:
+            raise RuntimeError(
+                f"{self.method.__name__} failed with illegal input (info={info})"
+            )
+        return solution
+
+
+def build_preconditioner(matrix: csr_matrix, name: str) -> LinearOperator | None:
+    if name == "none":
+        return None
+    if name == "jacobi":
+        inv_diagonal = 1.0 / matrix.diagonal()
+        return LinearOperator(matrix.shape, matvec=lambda x: inv_diagonal * x)
+    if name == "ilu":
+        ilu = spilu(matrix.tocsc(), drop_tol=1e-4, fill_factor=4)
+        return LinearOperator(matrix.shape, matvec=ilu.solve)
+    if name == "amg":
+        try:
+            import pyamg
+        except ImportError as e:
+            raise ImportError(
+                "The 'amg' preconditioner requires pyamg (pip install pyamg)."
+            ) from e
+        return pyamg.smoothed_aggregation_solver(matrix).aspreconditioner()
+    raise ValueError(
+        f"Unknown preconditioner '{name}'. Options: {', '.join(PRECONDITIONERS)}"
+    )
+
+
+def make_solver(
+    matrix: csr_matrix, settings: SolverSettings
+) -> DirectSolver | IterativeSolver:
+    if settings.solver == "direct":
+        return DirectSolver(matrix)
+    if settings.solver == "cg":
+        return IterativeSolver(matrix, settings)
+    raise ValueError(
+        f"Unknown solver '{settings.solver}'. Options: {', '.join(SOLVERS)}"
+    )
+
+
+class TransientSystem:
+    """Backward Euler system (H + C/dt) T = P + C T_prev / dt with Dirichlet nodes.
+
+    Dirichlet nodes are eliminated: only the free DOFs are solved for and the
+    known values enter through a lifting vector A_fd @ T_d computed once per dt.
+    The reduced matrix stays symmetric positive definite, so CG applies. The
+    left-hand side only depends on dt, so its solver (factorization or
+    preconditioner) and lifting vector are kept per dt value.
+
+    Temperatures are (nodes,) vectors, or (nodes, scenarios) blocks for a
+    system made by with_loads() from a block of load vectors.
+    """
+
+    def __init__(
+        self,
+        global_H: csr_matrix,
+        global_C: csr_matrix,
+        global_P: np.ndarray,
+        dirichlet_indices: np.ndarray,
+        dirichlet_value: float,
+        settings: SolverSettings = None,
+    ):
+        num_nodes = global_H.shape[0]
+        self.global_C = global_C
+        self.global_P = global_P
+        self.settings = settings if settings is not None else SolverSettings()
+
+        dirichlet_mask = np.zeros(num_nodes, dtype=bool)
+        dirichlet_mask[dirichlet_indices] = True
+        self.free = np.flatnonzero(~dirichlet_mask)
+        self.fixed = np.flatnonzero(dirichlet_mask)
+        self.dirichlet_values = np.full(len(self.fixed), dirichlet_value, dtype=float)
+
+        self.H_free_rows = global_H[self.free]
+        self.C_free_rows = global_C[self.free]
+        self.H_ff = self.H_free_rows[:, self.free]
+        self.C_ff = self.C_free_rows[:, self.free]
+        self.P_free = global_P[self.free]
+
+        self._solvers: dict[float, DirectSolver | IterativeSolver] = {}
+        self._lifting: dict[float, np.ndarray] = {}
+
+    def with_loads(
+        self, global_P: np.ndarray, dirichlet_value: float | np.ndarray
+    ) -> "TransientSystem":
+        """The same matrices with another load vector and Dirichlet value.
+
+        global_P may also be a (nodes, scenarios) block with one Dirichlet
+        value per column; every step then advances all scenarios with a single
+        multi-column solve. Solvers are shared with this system, so
+        factorizations are reused.
+        """
+        other = copy.copy(self)
+        other.global_P = global_P
+        other.P_free = global_P[self.free]
+        other.dirichlet_values = np.multiply.outer(
+            np.ones(len(self.fixed)), np.asarray(dirichlet_value, dtype=float)
+        )
+        other._lifting = {}
+        return other
+
+    @property
+    def state_shape(self) -> tuple:
+        """Shape of a temperature vector (or block) of this system."""
+        return (self.H_free_rows.shape[1],) + self.P_free.shape[1:]
+
+    def lhs_matrix(self, dt: float) -> csr_matrix:
+        return (self.H_ff + self.C_ff / dt).tocsr()
+
+    def lifting(self, dt: float) -> np.ndarray:
+        if dt not in self._lifting:
+            A_fd = (self.H_free_rows + self.C_free_rows / dt)[:, self.fixed]
+            self._lifting[dt] = A_fd @ self.dirichlet_values
+        return self._lifting[dt]
+
+    def solver(self, dt: float) -> DirectSolver | IterativeSolver:
+        if dt not in self._solvers:
+            self._solvers[dt] = make_solver(self.lhs_matrix(dt), self.settings)
+        return self._solvers[dt]
+
+    def steady_state(self) -> np.ndarray:
+        """Solves H T = P with the same Dirichlet values (the dt -> inf limit).
+
+        C / dt vanishes at dt = inf, so the factorization of H is cached with
+        the per-step solvers under that key.
+        """
+        dt = float("inf")
+        rhs_free = self.P_free - self.lifting(dt)
+
+        temperatures = np.empty(self.state_shape)
+        temperatures[self.free] = self.solver(dt).solve(rhs_free)
+        temperatures[self.fixed] = self.dirichlet_values
+        return temperatures
+
+    def step(self, t_prev: np.ndarray, dt: float) -> np.ndarray:
+        # C is applied to the full previous state, Dirichlet nodes included
+        rhs_free = self.P_free + self.C_free_rows @ t_prev / dt - self.lifting(dt)
+
+        t_next = np.empty_like(t_prev, dtype=float)
+        t_next[self.free] = self.solver(dt).solve(rhs_free, t_prev[self.free])
+        t_next[self.fixed] = self.dirichlet_values
+        return t_next
@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from config_loader import ConfigLoader, FullConfiguration
+from history import AppendableNpy, HistorySink
+from scenarios import Scenario, scenario_initial_temperatures, scenario_loads
+from simulate import simulate, transient_system
+from system_cache import default_cache, load_or_assemble, system_cache_key
+from time_stepping import TimeSteppingSettings
+
+# Die power [W] and ambient, water and initial temperature [C]
+RESPONSE_INPUTS = ("power", "ambient_temp", "water_temp", "initial_temp")
+
+
+def responses_path(base_path: str) -> str:
+    return base_path + "_responses.npy"
+
+
+def response_times_path(base_path: str) -> str:
+    return base_path + "_response_times.npy"
+
+
+def response_key_path(base_path: str) -> str:
+    return base_path + "_responses.json"
+
+
+def response_key(cfg: FullConfiguration) -> str:
+    """Hash of everything the unit responses depend on.
+
+    Power and the temperatures are the inputs of the basis, so they are left
+    out; everything else that shapes the system or the time steps is in.
+    """
+    sim = cfg.simulation
+    data = {
+        "mesh": system_cache_key(cfg.mesh_generator(power=1.0)),
+        "alpha": sim.alpha,
+        "sim_time": sim.sim_time,
+        "step_time": sim.step_time,
+        "mode": sim.mode,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class ResponseWriter(HistorySink):
+    """Streams (nodes, inputs) unit response blocks into a (time x node x input) .npy."""
+
+    def __init__(self, base_path: str, num_nodes: int):
+        self.responses = AppendableNpy(
+            responses_path(base_path), (num_nodes, len(RESPONSE_INPUTS))
+        )
+        self.times = AppendableNpy(response_times_path(base_path))
+
+    def write(self, time: float, temperatures: np.ndarray) -> None:
+        self.responses.append(temperatures)
+        self.times.append(np.array([time]))
+
+    def close(self) -> None:
+        self.responses.close()
+        self.times.close()
+
+
+def build_response_basis(cfg: FullConfiguration, base_path: str) -> "ResponseBasis":
+    """Simulates the unit response of every input and stores them at base_path.
+
+    The heat equation is linear in the die power and the ambient, water and
+    initial temperatures, so each response is the solution with that input at
+    1 (W or C) and the others at 0. All four run as one scenario block. Steps
+    are fixed at step_time: adaptive step choices and steady_tolerance depend
+    on the loads, so they would not carry over to other combinations.
+    """
+    grid, assembled = load_or_assemble(cfg.mesh_generator(power=1.0), default_cache())
+    global_data = cfg.global_data()
+    # One input at 1 and the others at 0; Scenario fields follow RESPONSE_INPUTS
+    scenarios = [
+        Scenario(name, *map(float, unit))
+        for name, unit in zip(RESPONSE_INPUTS, np.eye(len(RESPONSE_INPUTS)))
+    ]
+
+    system = transient_system(grid, global_data, cfg.simulation.solver, assembled)
+    global_P, water_temps = scenario_loads(assembled, global_data, scenarios)
+
+    # The key is written last, so an interrupted build never matches a stale key
+    key_path = response_key_path(base_path)
+    if os.path.exists(key_path):
+        os.remove(key_path)
+    with ResponseWriter(base_path, grid.num_nodes) as writer:
+        simulate(
+            grid,
+            global_data,
+            cfg.simulation.solver,
+            sink=writer,
+            system=system.with_loads(global_P, water_temps),
+            time_stepping=TimeSteppingSettings(),
+            mode=cfg.simulation.mode,
+            initial_temperatures=scenario_initial_temperatures(
+                grid.num_nodes, global_data, scenarios
+            ),
+        )
+    with open(key_path, "w") as f:
+        json.dump({"key": response_key(cfg), "inputs": RESPONSE_INPUTS}, f)
+    return ResponseBasis(base_path)
+
+
+def load_or_build_response_basis(
+    cfg: FullConfiguration, base_path: str
+) -> "ResponseBasis":
+    """The stored basis at base_path, rebuilt when it does not match cfg."""
+    try:
+        with open(response_key_path(base_path)) as f:
+            stored_key = json.load(f)["key"]
+    except (OSError, ValueError, KeyError):
+        stored_key = None
+    if stored_key == response_key(cfg):
+        return ResponseBasis(base_path)
+    return build_response_basis(cfg, base_path)
+
+
+class ResponseBasis:
+    """Memory-mapped unit responses of a stored basis.
+
+    Temperatures for any power and ambient, water and initial temperature are
+    a weighted sum of the responses; steps and nodes can be sliced so only
+    the touched part is read.
+    """
+
+    def __init__(self, base_path: str):
+        self.responses = np.load(responses_path(base_path), mmap_mode="r")
+        self.times = np.load(response_times_path(base_path))
+
+    @property
+    def num_nodes(self) -> int:
+        return self.responses.shape[1]
+
+    def __len__(self) -> int:
+        return self.responses.shape[0]
+
+    def evaluate(
+        self,
+        power: float,
+        ambient_temp: float,
+        water_temp: float,
+        initial_temp: float,
+        steps=slice(None),
+        nodes=slice(None),
+    ) -> np.ndarray:
+        """(steps, nodes) temperatures of one input combination."""
+        weights = np.array([power, ambient_temp, water_temp, initial_temp])
+        return self.responses[steps, nodes] @ weights
+
+    def max_temperatures(self, *inputs: float) -> np.ndarray:
+        """Per-step max temperature of one input combination."""
+        return np.max(self.evaluate(*inputs), axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate power/temperature combinations from unit responses."
+    )
+    parser.add_argument("config_file", help="e.g. simulations/ryzen_7.toml")
+    parser.add_argument("--power", type=float, help="Die power [W]")
+    parser.add_argument("--ambient", type=float, help="Ambient temperature [C]")
+    parser.add_argument("--water", type=float, help="Water temperature [C]")
+    parser.add_argument("--initial", type=float, help="Initial temperature [C]")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the basis")
+    args = parser.parse_args()
+
+    cfg = ConfigLoader.load_from_file(args.config_file)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(os.path.join(script_dir, "output"), exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(args.config_file))[0]
+    base_path = os.path.join(script_dir, "output", base_name)
+
+    start_time = time.time()
+    if args.rebuild:
+        basis = build_response_basis(cfg, base_path)
+    else:
+        basis = load_or_build_response_basis(cfg, base_path)
+    print(f"Response basis: {len(basis)} steps ({time.time() - start_time:.2f} s)")
+
+    inputs = (
+        cfg.power if args.power is None else args.power,
+        cfg.simulation.ambient_temp if args.ambient is None else args.ambient,
+        cfg.simulation.water_temp if args.water is None else args.water,
+        cfg.simulation.initial_temp if args.initial is None else args.initial,
+    )
+    start_time = time.time()
+    max_temps = basis.max_temperatures(*inputs)
+    duration = time.time() - start_time
+
+    peak = int(np.argmax(max_temps))
+    print(", ".join(f"{name}: {value}" for name, value in zip(RESPONSE_INPUTS, inputs)))
+    print(f"Max Temp Reached: {max_temps[-1]:.2f} C")
+    print(f"Peak: {max_temps[peak]:.2f} C at {basis.times[peak]:.2f} s")
+    print(f"Evaluation Time: {duration * 1000:.1f} ms")
@@ -0,0 +1,346 @@
+import argparse
+import copy
+import csv
+import dataclasses
+import functools
+import itertools
+import multiprocessing
+import os
+import time
+import tomllib
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+from tqdm import tqdm
+
+from concurrency import limit_threads, plan_concurrency
+from config import MAX_PROCESSES, MULTIPROCESSING_ENABLED, THREADS_PER_PROCESS
+from config_loader import ConfigLoader, FullConfiguration
+from history import MaxTemperatureTracker, MultiSink, NpyHistoryWriter
+from scenarios import Scenario, ScenarioSinks, simulate_scenarios
+from simulate import transient_system
+from solver import TransientSystem
+from system_cache import default_cache, load_or_assemble, system_cache_key
+
+
+@dataclass
+class SweepJob:
+    name: str
+    overrides: Dict[str, Any]  # dotted TOML key -> value
+    config: FullConfiguration
+    mesh_key: str  # Jobs with the same key share grid and assembled matrices
+
+
+def parameter_values(key: str, spec: Any) -> List[Any]:
+    """Values of one swept parameter.
+
+    spec is a list, a {values = [...]} table, a {start, stop, num} table
+    (evenly spaced, stop included) or a {start, stop, step} table (stop
+    included when reached). Any other value is used as the only value.
+    """
+    if isinstance(spec, list):
+        values = spec
+    elif isinstance(spec, dict):
+        if "values" in spec:
+            values = list(spec["values"])
+        elif {"start", "stop", "num"} <= spec.keys():
+            values = np.linspace(spec["start"], spec["stop"], int(spec["num"])).tolist()
+        elif {"start", "stop", "step"} <= spec.keys():
+            start, stop, step = spec["start"], spec["stop"], spec["step"]
+            if step == 0 or (stop - start) / step < 0:
+                raise ValueError(f"Sweep parameter '{key}': step does not reach stop")
+            count = int(np.floor((stop - start) / step + 1e-9)) + 1
+            values = [start + i * step for i in range(count)]
+        else:
+            raise ValueError(
+                f"Sweep parameter '{key}' needs a list, 'values', "
+                "'start'/'stop'/'num' or 'start'/'stop'/'step'"
+            )
+    else:
+        values = [spec]
+
+    if not values:
+        raise ValueError(f"Sweep parameter '{key}' has no values")
+    return values
+
+
+def set_dotted(data: Dict[str, Any], key: str, value: Any) -> None:
+    """Sets data["a"]["b"]["c"] for key "a.b.c", creating missing tables."""
+    *tables, name = key.split(".")
+    for table in tables:
+        data = data.setdefault(table, {})
+    data[name] = value
+
+
+def has_dotted(data: Dict[str, Any], key: str) -> bool:
+    for part in key.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return False
+        data = data[part]
+    return True
+
+
+def expand_sweep(sweep_file: str) -> tuple[str, List[str], List[SweepJob]]:
+    """Reads a sweep file and returns its name, swept keys and jobs.
+
+    Jobs are the cartesian product of all [parameters] on top of the base
+    config named in [sweep].
+    """
+    with open(sweep_file, "rb") as f:
+        sweep_data = tomllib.load(f)
+
+    settings = sweep_data.get("sweep", {})
+    if "base" not in settings:
+        raise ValueError(f"{sweep_file}: [sweep] must name a base config")
+    base_file = os.path.join(os.path.dirname(sweep_file), settings["base"])
+    with open(base_file, "rb") as f:
+        base_data = tomllib.load(f)
+
+    name = settings.get("name", os.path.splitext(os.path.basename(sweep_file))[0])
+    parameters = sweep_data.get("parameters", {})
+    keys = list(parameters)
+    for key in keys:
+        if not has_dotted(base_data, key):
+            print(f"Warning: '{key}' is not set in {base_file}; it will be added.")
+    values = [parameter_values(key, parameters[key]) for key in keys]
+
+    jobs = []
+    for index, combination in enumerate(itertools.product(*values)):
+        data = copy.deepcopy(base_data)
+        overrides = dict(zip(keys, combination))
+        for key, value in overrides.items():
+            set_dotted(data, key, value)
+        config = ConfigLoader.load_from_dict(data)
+        jobs.append(
+            SweepJob(
+                name=f"{name}_{index:04d}",
+                overrides=overrides,
+                config=config,
+                mesh_key=system_cache_key(config.mesh_generator(power=1.0)),
+            )
+        )
+    return name, keys, jobs
+
+
+def group_jobs(jobs: List[SweepJob]) -> List[List[SweepJob]]:
+    """Groups jobs by mesh key, largest (by nodes x steps) first.
+
+    A group runs in one worker, so it is meshed and assembled once and jobs
+    with the same alpha, step and solver reuse one factorization. Die power
+    is not part of the key, since heat sources scale linearly with it.
+    """
+    groups: Dict[str, List[SweepJob]] = {}
+    for job in jobs:
+        groups.setdefault(job.mesh_key, []).append(job)
+
+    def cost(group: List[SweepJob]) -> float:
+        nodes = group[0].config.mesh_generator().num_nodes
+        steps = sum(
+            job.config.simulation.sim_time / job.config.simulation.step_time
+            for job in group
+        )
+        return nodes * steps
+
+    return sorted(groups.values(), key=cost, reverse=True)
+
+
+def batch_key(config: FullConfiguration) -> tuple:
+    """Jobs with the same key only differ in power and the temperatures."""
+    sim = config.simulation
+    return (
+        sim.sim_time,
+        sim.step_time,
+        sim.alpha,
+        sim.mode,
+        dataclasses.astuple(sim.solver),
+        dataclasses.astuple(sim.time_stepping),
+    )
+
+
+def run_job_group(jobs: List[SweepJob], output_dir: str = None) -> List[Dict[str, Any]]:
+    """Runs jobs that share a mesh and returns one summary row per job.
+
+    Jobs with the same batch key run as scenarios of one simulation, solving
+    all of them with one factorization per step size. Full temperature
+    histories are written to output_dir when it is given.
+    """
+    # Heat sources scale with die power, so one assembly at 1 W serves all powers
+    start_time = time.time()
+    try:
+        grid, assembled = load_or_assemble(
+            jobs[0].config.mesh_generator(power=1.0), default_cache()
+        )
+    except Exception as e:
+        compute_time = (time.time() - start_time) / len(jobs)
+        return [
+            {
+                "job": job.name,
+                **job.overrides,
+                "status": f"error: {e}",
+                "compute_time": compute_time,
+            }
+            for job in jobs
+        ]
+    systems: Dict[tuple, TransientSystem] = {}
+
+    batches: Dict[tuple, List[SweepJob]] = {}
+    for job in jobs:
+        batches.setdefault(batch_key(job.config), []).append(job)
+
+    rows = []
+    for batch in batches.values():
+        start_time = time.time()
+        trackers = [MaxTemperatureTracker() for _ in batch]
+        try:
+            simulation = batch[0].config.simulation
+            global_data = batch[0].config.global_data()
+
+            # The left-hand side only depends on alpha, dt and the solver
+            lhs_key = (
+                global_data.Alpha,
+                global_data.SimulationStepTime,
+                dataclasses.astuple(simulation.solver),
+            )
+            if lhs_key not in systems:
+                systems[lhs_key] = transient_system(
+                    grid, global_data, simulation.solver, assembled
+                )
+
+            scenarios = [
+                Scenario(
+                    job.name,
+                    power_scale=job.config.power,
+                    ambient_temp=job.config.simulation.ambient_temp,
+                    water_temp=job.config.simulation.water_temp,
+                    initial_temp=job.config.simulation.initial_temp,
+                )
+                for job in batch
+            ]
+            sinks = []
+            for job, tracker in zip(batch, trackers):
+                job_sinks = [tracker]
+                if output_dir is not None:
+                    job_sinks.append(
+                        NpyHistoryWriter(
+                            os.path.join(output_dir, job.name), grid.num_nodes
+                        )
+                    )
+                sinks.append(MultiSink(*job_sinks))
+            with ScenarioSinks(sinks):
+                simulate_scenarios(
+                    grid,
+                    global_data,
+                    scenarios,
+                    simulation.solver,
+                    sinks=sinks,
+                    assembled=assembled,
+                    system=systems[lhs_key],
+                    time_stepping=simulation.time_stepping,
+                    mode=simulation.mode,
+                )
+            status = "ok"
+        except Exception as e:
+            status = f"error: {e}"
+        compute_time = (time.time() - start_time) / len(batch)
+
+        for job, tracker in zip(batch, trackers):
+            row = {"job": job.name, **job.overrides, "nodes": grid.num_nodes}
+            if status == "ok":
+                row["max_temp"] = max(tracker.max_temps)
+                row["final_max_temp"] = tracker.max_temps[-1]
+                row["final_min_temp"] = tracker.min_temps[-1]
+                row["time_reached"] = tracker.times[-1]
+            row["status"] = status
+            row["compute_time"] = compute_time
+            rows.append(row)
+    return rows
+
+
+def write_summary(path: str, keys: List[str], rows: List[Dict[str, Any]]) -> None:
+    columns = ["job", *keys, "nodes", "max_temp", "final_max_temp"]
+    columns += ["final_min_temp", "time_reached", "compute_time", "status"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in sorted(rows, key=lambda row: row["job"]):
+            writer.writerow(
+                {
+                    column: f"{value:.4f}" if isinstance(value, float) else value
+                    for column, value in row.items()
+                }
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a parameter sweep declared in a sweep TOML file."
+    )
+    parser.add_argument("sweep_file", help="e.g. simulations/sweeps/paste_power.toml")
+    parser.add_argument(
+        "--save-history",
+        action="store_true",
+        help="Also store each job's temperature history in output/<sweep name>/",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=MAX_PROCESSES if MULTIPROCESSING_ENABLED else 1,
+        help="Maximum number of worker processes",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=THREADS_PER_PROCESS,
+        help="BLAS/OpenMP threads per process (0: CPUs / processes)",
+    )
+    args = parser.parse_args()
+
+    sweep_name, keys, jobs = expand_sweep(args.sweep_file)
+    groups = group_jobs(jobs)
+    plan = plan_concurrency(len(groups), args.processes, args.threads)
+    print(f"--- Sweep '{sweep_name}': {len(jobs)} jobs on {len(groups)} meshes ---")
+    print(f"--- Running on {plan} ---")
+    for key in keys:
+        values = sorted({str(job.overrides[key]) for job in jobs})
+        print(f" - {key}: {', '.join(values)}")
+    print("-" * 40)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    output_dir = os.path.join(script_dir, "output")
+    history_dir = None
+    if args.save_history:
+        history_dir = os.path.join(output_dir, sweep_name)
+        os.makedirs(history_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    start_global = time.time()
+    run_group = functools.partial(run_job_group, output_dir=history_dir)
+    rows = []
+    with tqdm(total=len(jobs), desc="Sweep Progress") as progress:
+        if plan.processes > 1:
+            with multiprocessing.Pool(
+                processes=plan.processes,
+                initializer=limit_threads,
+                initargs=(plan.threads_per_process,),
+            ) as pool:
+                for group_rows in pool.imap_unordered(run_group, groups):
+                    rows.extend(group_rows)
+                    progress.update(len(group_rows))
+        else:
+            limit_threads(plan.threads_per_process)
+            for group in groups:
+                group_rows = run_group(group)
+                rows.extend(group_rows)
+                progress.update(len(group_rows))
+    total_time = time.time() - start_global
+
+    summary_path = os.path.join(output_dir, f"{sweep_name}_summary.csv")
+    write_summary(summary_path, keys, rows)
+
+    failed = [row for row in rows if row["status"] != "ok"]
+    print("\n--- Sweep Finished ---")
+    print(f"Total sweep time: {total_time:.2f} s")
+    print(f"Summary: {summary_path}")
+    for row in failed:
+        print(f"{row['job']}: {row['status']}")
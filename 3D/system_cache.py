@@ -0,0 +1,165 @@
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from assembly import AssembledSystem, assemble_system
+from config import (
+    ENTIRE_RADIATOR_HAS_DERICHLET_BC,
+    NUMBER_OF_INTEGRATION_POINTS,
+    SYSTEM_CACHE_ENABLED,
+    SYSTEM_CACHE_MAX_MB,
+)
+from fem_types import Grid
+from mesh_generator.mesh_generator import MeshGenerator
+
+# Bump when the stored layout or the assembly itself changes
+CACHE_FORMAT_VERSION = 1
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+MATRIX_NAMES = ("H_conduction", "H_convection", "C")
+VECTOR_NAMES = ("P_source", "P_convection")
+
+
+def system_cache_key(generator: MeshGenerator) -> str:
+    """Hash of every input that affects the grid and its assembled matrices.
+
+    Time stepping, initial temperature, water temperature, alpha and ambient
+    temperature are applied after assembly and are deliberately left out.
+    """
+    description = {
+        "version": CACHE_FORMAT_VERSION,
+        "geometry": dataclasses.asdict(generator.geo),
+        "materials": dataclasses.asdict(generator.materials),
+        "layers": dataclasses.asdict(generator.layers),
+        "power": generator.power,
+        "pattern": generator.pattern.name,
+        "integration_points": NUMBER_OF_INTEGRATION_POINTS,
+        "entire_radiator_dirichlet": ENTIRE_RADIATOR_HAS_DERICHLET_BC,
+    }
+    encoded = json.dumps(description, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class SystemCache:
+    """On-disk cache of generated grids and their assembled systems.
+
+    One .npz per key. Hits refresh the file's modification time and the least
+    recently used entries are evicted once the directory exceeds max_bytes.
+    Entries are written to a temporary file and renamed, so parallel workers
+    never read a partial file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key: str) -> tuple[Grid, AssembledSystem] | None:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                grid = Grid(
+                    **{
+                        field.name: data["grid_" + field.name]
+                        for field in dataclasses.fields(Grid)
+                    }
+                )
+                shape = (grid.num_nodes, grid.num_nodes)
+                indices, indptr = data["indices"], data["indptr"]
+                matrices = {
+                    name: csr_matrix(
+                        (data[name], indices.copy(), indptr.copy()), shape=shape
+                    )
+                    for name in MATRIX_NAMES
+                }
+                vectors = {name: data[name] for name in VECTOR_NAMES}
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Warning: Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        os.utime(path)
+        return grid, AssembledSystem(**matrices, **vectors)
+
+    def store(self, key: str, grid: Grid, system: AssembledSystem) -> None:
+        arrays = {
+            "grid_" + field.name: getattr(grid, field.name)
+            for field in dataclasses.fields(Grid)
+        }
+        arrays["indices"] = system.H_conduction.indices
+        arrays["indptr"] = system.H_conduction.indptr
+        for name in MATRIX_NAMES:
+            arrays[name] = getattr(system, name).data
+        for name in VECTOR_NAMES:
+            arrays[name] = getattr(system, name)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self.path(key))
+        except OSError as e:
+            print(f"Warning: Could not write cache entry for {key}: {e}")
+            self._remove(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.directory, name))
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def default_cache() -> SystemCache | None:
+    """The cache in cache/ next to this module, or None when disabled."""
+    if not SYSTEM_CACHE_ENABLED:
+        return None
+    return SystemCache(CACHE_DIR, SYSTEM_CACHE_MAX_MB * 1024 * 1024)
+
+
+def load_or_assemble(
+    generator: MeshGenerator, cache: SystemCache | None
+) -> tuple[Grid, AssembledSystem]:
+    """Grid and assembled system of generator, taken from cache when possible."""
+    key = system_cache_key(generator)
+    cached = cache.load(key) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    grid = generator.generate_grid()
+    system = assemble_system(grid)
+    if cache is not None:
+        cache.store(key, grid, system)
+    return grid, system